@@ -9,6 +9,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.db import Base
 from app.models import User, Book, Review, Borrow, UserPreference  # noqa: ensure models are imported
+from app.models import PrecomputedRecommendation  # noqa: F401 - registers the precomputed_recommendations table
+from app.models import PrecomputedDiscard  # noqa: F401 - registers the precomputed_discards table
+from app.models import Job  # noqa: F401 - registers the jobs table
 from app.core.config import settings
 
 config = context.config
@@ -0,0 +1,163 @@
+"""
+Management commands.
+
+    python -m app.cli build-ann-index
+    python -m app.cli precompute-recommendations [--limit N] [--workers N]
+    python -m app.cli worker
+    python -m app.cli repair-ratings
+    python -m app.cli train-sentiment [--min-samples N]
+    python -m app.cli import-books PATH [--format csv|jsonl] [--no-update]
+"""
+import argparse
+import asyncio
+import json
+import signal
+
+from app.core.config import settings
+from app.db import AsyncSessionLocal, init_db
+
+
+async def build_ann_index(args):
+    from app.services import ann
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        await ann.index.rebuild(db)
+    print(f"ANN index written to {ann.index.root} (version {ann.index.version})")
+
+
+async def precompute_recommendations(args):
+    from app.services import precompute
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        stats = await precompute.run(db, limit=args.limit, workers=args.workers, chunk_size=args.chunk_size)
+    print(f"Precomputed recommendations for {stats['users']} users "
+          f"with {stats['workers']} workers in {stats['seconds']}s")
+
+
+async def worker(args):
+    # tasks registers the job handlers
+    from app.services import jobs, llm, sentiment, tasks  # noqa: F401
+
+    await init_db()
+    sentiment.local.load()  # review_sentiment jobs run here when JOB_WORKER_IN_PROCESS=false
+    await llm.startup()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, jobs.worker.stop)
+    print(f"Job worker {jobs.worker.id} running: {', '.join(sorted(jobs.registry))}")
+    try:
+        await jobs.worker.run_forever()
+    finally:
+        await llm.shutdown()
+
+
+async def repair_ratings(args):
+    from app.services import ratings
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        count = await ratings.repair(db)
+    print(f"Recomputed rating aggregates for {count} reviewed books")
+
+
+async def train_sentiment(args):
+    from sqlalchemy import select
+
+    from app.models.review import Review
+    from app.services import sentiment
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(Review.text, Review.rating, Review.sentiment, Review.sentiment_source)
+            .where(Review.text.is_not(None), Review.text != "")
+            .execution_options(yield_per=settings.DB_STREAM_BATCH_SIZE)
+        )
+        # LLM labels where we have them, otherwise the star rating; labels the local classifier
+        # wrote (or of unknown origin) would only teach the model its own mistakes
+        samples = [
+            (text, label if source == "llm" and label else sentiment.label_for_rating(rating))
+            async for text, rating, label, source in result
+        ]
+    if len(samples) < args.min_samples or len({label for _, label in samples}) < 2:
+        print(f"Need at least {args.min_samples} reviews with text covering 2+ labels (have {len(samples)})")
+        return
+
+    import random
+
+    random.Random(0).shuffle(samples)
+    split = max(1, len(samples) // 5)
+    holdout, train = samples[:split], samples[split:]
+    model = await asyncio.to_thread(sentiment.train_model, train)
+    probs = model.predict_proba([text for text, _ in holdout])
+    confident = correct = 0
+    for (_, label), p in zip(holdout, probs):
+        if p.max() >= settings.SENTIMENT_LOCAL_THRESHOLD:
+            confident += 1
+            correct += model.classes_[p.argmax()] == label
+    print(f"Holdout: {confident}/{len(holdout)} confident at threshold {settings.SENTIMENT_LOCAL_THRESHOLD}, "
+          f"accuracy {correct / confident if confident else 0:.3f} on those")
+
+    sentiment.local.save(await asyncio.to_thread(sentiment.train_model, samples))
+    print(f"Model trained on {len(samples)} reviews written to {sentiment.local.path} (restart the API and job workers to load)")
+
+
+async def import_books(args):
+    from app.services import ann, importer, tasks  # noqa: F401 - tasks registers job handlers
+
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+
+    async def chunks():
+        with open(args.path, "rb") as f:
+            while chunk := await asyncio.to_thread(f.read, 1 << 16):
+                yield chunk
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        written = 0
+        async for event in importer.run(db, chunks(), fmt, update=args.update):
+            print(json.dumps(event), flush=True)
+            written = event.get("written", written)
+        # API workers pick up the new version within ANN_RELOAD_CHECK_SECONDS
+        if written and ann.index.load():
+            await ann.index.rebuild(db)
+            print(f"ANN index rebuilt (version {ann.index.version})", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build-ann-index", help="Rebuild the similar-books ANN index")
+    p.set_defaults(func=build_ann_index)
+
+    p = sub.add_parser("precompute-recommendations", help="Store top-N hybrid recommendations for every user")
+    p.add_argument("--limit", type=int, default=settings.PRECOMPUTE_TOP_N)
+    p.add_argument("--workers", type=int, default=0, help="process pool size (default: CPU count)")
+    p.add_argument("--chunk-size", type=int, default=500, help="users per worker task")
+    p.set_defaults(func=precompute_recommendations)
+
+    p = sub.add_parser("worker", help="Run background jobs (set JOB_WORKER_IN_PROCESS=false on the API)")
+    p.set_defaults(func=worker)
+
+    p = sub.add_parser("repair-ratings", help="Recompute every book's rating aggregates from its reviews")
+    p.set_defaults(func=repair_ratings)
+
+    p = sub.add_parser("train-sentiment", help="Train the local sentiment classifier from existing reviews")
+    p.add_argument("--min-samples", type=int, default=200)
+    p.set_defaults(func=train_sentiment)
+
+    p = sub.add_parser("import-books", help="Bulk import books from a CSV or JSONL file, upserting on isbn")
+    p.add_argument("path")
+    p.add_argument("--format", choices=("csv", "jsonl"))
+    p.add_argument("--no-update", dest="update", action="store_false", help="skip rows whose isbn already exists")
+    p.set_defaults(func=import_books)
+
+    args = parser.parse_args()
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,15 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "dev-secret-key"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    BCRYPT_ROUNDS: int = 12  # changing it rehashes each password at its next login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # waiting hashes beyond this are rejected with 503
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: int = 30  # bounds staleness across processes; local changes invalidate at once
 
     STORAGE_BACKEND: str = "local"
     LOCAL_STORAGE_PATH: str = "./uploads"
+    INDEX_DIR: str = "./data"
     AWS_BUCKET: str = ""
     AWS_REGION: str = "us-east-1"
 
@@ -16,8 +22,67 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://ollama:11434"
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_HTTP2: bool = True
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MEMORY_SIZE: int = 2000
+    LLM_CACHE_MAX_ENTRIES: int = 100000
+    LLM_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    LLM_CONCURRENCY: dict[str, int] = {"ollama": 4, "openai": 16}
+    LLM_RATE_LIMITS: dict[str, float] = {}  # calls/second per provider; unset = unlimited
+    LLM_RATE_BURST: int = 5
+    LLM_INTERACTIVE_RESERVED_SLOTS: int = 1
+    LLM_INTERACTIVE_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    LLM_BACKGROUND_QUEUE_TIMEOUT_SECONDS: float = 300.0
+    SENTIMENT_LOCAL_ENABLED: bool = True
+    SENTIMENT_LOCAL_THRESHOLD: float = 0.8
+    SENTIMENT_BATCH_SIZE: int = 16
+    SENTIMENT_BATCH_WINDOW_MS: int = 50
 
     RECOMMENDATION_ENGINE: str = "hybrid"
+    CATALOG_TFIDF_MAX_FEATURES: int = 20000
+    CATALOG_REFIT_RATIO: float = 0.2
+    CATALOG_REFRESH_SECONDS: int = 300
+    CF_MIN_RATING: int = 4
+    CF_REFRESH_SECONDS: int = 900
+    ANN_DIM: int = 128
+    ANN_NPROBE: int = 8
+    ANN_RELOAD_CHECK_SECONDS: int = 60
+    ANN_REBUILD_RATIO: float = 0.1  # books changed since the build, as a share of the index
+    ANN_REBUILD_SECONDS: int = 6 * 3600  # 0 = rebuild only on changes
+    CANDIDATE_MIN_RATING: float = 3.5
+    DB_STREAM_BATCH_SIZE: int = 2000
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_SPOOL_MAX_BYTES: int = 8 * 1024 * 1024  # larger uploads are buffered on disk
+    PAGE_MAX_LIMIT: int = 100
+    # Postgres text search configuration; changing it regenerates books.search_vector at startup
+    SEARCH_TEXT_CONFIG: str = "english"
+    PRECOMPUTE_TOP_N: int = 50
+    PRECOMPUTED_MAX_AGE_SECONDS: int = 6 * 3600
+    RERANK_CANDIDATES: int = 20
+    RERANK_TIMEOUT_SECONDS: float = 3.0
+    RERANK_CACHE_SIZE: int = 10000
+    RERANK_CACHE_TTL_SECONDS: int = 3600
+    RECOMMENDATION_EXECUTOR: str = "thread"
+    RECOMMENDATION_WORKERS: int = 4
+    RECOMMENDATION_MAX_CONCURRENCY: int = 4
+    RECOMMENDATION_CACHE_SIZE: int = 10000
+    RECOMMENDATION_CACHE_TTL_SECONDS: int = 300
+
+    JOB_WORKER_IN_PROCESS: bool = True
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_CONCURRENCY: dict[str, int] = {}
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_SECONDS: float = 5.0
+    JOB_RETRY_MAX_SECONDS: float = 600.0
+    JOB_LOCK_TIMEOUT_SECONDS: int = 600
+    JOB_RETENTION_SECONDS: int = 24 * 3600
+    CONSENSUS_QUIET_SECONDS: float = 30.0
+    CONSENSUS_MAX_DELAY_SECONDS: float = 300.0
 
     class Config:
         env_file = ".env"
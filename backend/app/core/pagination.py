@@ -0,0 +1,64 @@
+"""
+Keyset pagination for list endpoints.
+Pages are ordered newest first by (timestamp, id) and each page starts strictly after the last
+row of the previous one, so with a matching composite index a deep page costs the same as the
+first. The cursor is an opaque base64 token for that last row. When more rows follow, the next
+one is returned in the X-Next-Cursor response header, which keeps the response bodies plain
+lists; ``skip`` still works, on its own or after a cursor.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+T = TypeVar("T")
+Key = Tuple[datetime, int]
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Key) -> str:
+    created_at, id_ = key
+    raw = json.dumps([created_at.isoformat(), id_]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Key:
+    try:
+        created_at, id_ = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(id_)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def clamp(limit: int) -> int:
+    return max(1, min(limit, settings.PAGE_MAX_LIMIT))
+
+
+def keyset(
+    db: AsyncSession, q: Select, created_at, id_, cursor: Optional[str], skip: int, limit: int
+) -> Select:
+    """Order ``q`` by ``(created_at, id_)`` descending and select the page after ``cursor``.
+    Fetches one extra row so :func:`respond` can tell whether there is a next page."""
+    if cursor:
+        after = decode_cursor(cursor)
+        column = created_at
+        if db.bind.dialect.name == "sqlite":
+            # SQLite keeps timestamps as text, with or without microseconds; compare normalized
+            column, after = func.datetime(created_at), (func.datetime(after[0].isoformat(" ")), after[1])
+        q = q.where(tuple_(column, id_) < tuple_(*after))
+    return q.order_by(created_at.desc(), id_.desc()).offset(skip).limit(limit + 1)
+
+
+def respond(response: Response, rows: List[T], limit: int, key: Callable[[T], Key]) -> List[T]:
+    """Trim the extra row fetched by :func:`keyset` and set the next-page cursor header."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
@@ -1,23 +1,111 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import partial
+from typing import Any, Callable, Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 
 from app.core.config import settings
+from app.db import get_db
+from app.models.user import User
+from app.services.cache import TTLCache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with any other cost are flagged by verify_and_update and rehashed on the next login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+class PasswordHasher:
+    """
+    Runs bcrypt (100+ ms of CPU per call, GIL released) on a dedicated thread pool so logins
+    never block the event loop. At most ``workers`` hashes run at once and at most ``max_queue``
+    wait; beyond that callers are turned away with 503 at once instead of piling up.
+    """
 
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queued = 0
+        self.max_queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    def _ensure(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        self._ensure()
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status.HTTP_503_SERVICE_UNAVAILABLE, "Too many sign-ins in progress, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        queued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        started = time.perf_counter()
+        self.wait_seconds += started - queued_at
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.run_seconds += time.perf_counter() - started
+            self._semaphore.release()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._semaphore = None
+
+    def stats(self) -> dict:
+        return {
+            "rounds": settings.BCRYPT_ROUNDS,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+hasher = PasswordHasher(workers=settings.PASSWORD_HASH_WORKERS, max_queue=settings.PASSWORD_HASH_MAX_QUEUE)
+
+
+async def hash_password(password: str) -> str:
+    return await hasher.run(pwd_context.hash, password)
+
+
+async def verify_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """``(valid, new_hash)``; ``new_hash`` is set when the stored hash should be replaced."""
+    return await hasher.run(pwd_context.verify_and_update, plain, hashed)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -34,11 +122,44 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    from app.db import get_db
-    from app.models.user import User
-    from sqlalchemy import select
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by request handlers: a cached snapshot, not an ORM object."""
+
+    id: int
+    email: str
+    username: str
+    is_active: bool
+    is_admin: bool
+    created_at: datetime
+
 
+# Principals by user id. Entries are dropped when the user row is updated or deleted through
+# the ORM in this process; the TTL bounds how long other processes can see a stale entry.
+principals = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def _forget(user_id: int):
+    principals.pop(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _forget_user(mapper, connection, target: User):
+    _forget(target.id)
+    # Again once committed, in case a concurrent request re-cached the old row meanwhile
+    session = object_session(target)
+    if session is not None:
+        event.listen(session, "after_commit", lambda s: _forget(target.id), once=True)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _forget_bulk(state):
+    if (state.is_update or state.is_delete) and state.bind_mapper is User.__mapper__:
+        principals.clear()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -47,15 +168,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     payload = decode_token(token)
     if payload is None:
         raise credentials_exception
-    user_id: int = payload.get("sub")
+    user_id = payload.get("sub")
     if user_id is None:
         raise credentials_exception
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        raise credentials_exception
 
-    # Import here to avoid circular imports
-    from app.db import AsyncSessionLocal
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(select(User).where(User.id == int(user_id)))
-        user = result.scalar_one_or_none()
-        if user is None:
+    principal = principals.get(user_id)
+    if principal is None:
+        # Same session as the endpoint (get_db is resolved once per request)
+        result = await db.execute(
+            select(User.id, User.email, User.username, User.is_active, User.is_admin, User.created_at)
+            .where(User.id == user_id)
+        )
+        row = result.one_or_none()
+        if row is None:
             raise credentials_exception
-        return user
+        principal = Principal(*row)
+        principals.set(user_id, principal)
+    if not principal.is_active:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Inactive user")
+    return principal
@@ -1,3 +1,7 @@
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
@@ -20,3 +24,17 @@ async def get_db():
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+def dialect_insert(db: AsyncSession):
+    """``insert`` for the session's dialect, for ``ON CONFLICT`` support."""
+    return (postgresql if db.bind.dialect.name == "postgresql" else sqlite).insert
+
+
+async def load_many(db: AsyncSession, model, ids: Iterable[int]) -> Dict[int, object]:
+    """Fetch ``model`` rows by primary key with one ``IN`` query, as ``{id: row}``; missing ids are absent."""
+    ids = set(ids)
+    if not ids:
+        return {}
+    result = await db.execute(select(model).where(model.id.in_(ids)))
+    return {row.id: row for row in result.scalars().all()}
@@ -1,19 +1,39 @@
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import init_db
+from app.db import AsyncSessionLocal, get_db, init_db
+from app.core import pagination, security
 from app.core.config import settings
 from app.routers import auth, books, borrows, reviews, recommendations, preferences
+from app.services import ann, compute, jobs, llm, llm_cache, llm_scheduler, sentiment, tasks  # noqa: F401 - tasks registers job handlers
+from app.services import ratings
+from app.services import recommendations as recommendation_service
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    async with AsyncSessionLocal() as db:
+        await ratings.backfill(db)
     os.makedirs(settings.LOCAL_STORAGE_PATH, exist_ok=True)
+    ann.index.load()
+    sentiment.local.load()
+    await llm.startup()
+    lag_monitor = asyncio.create_task(compute.pool.monitor_loop_lag())
+    job_worker = asyncio.create_task(jobs.worker.run_forever()) if settings.JOB_WORKER_IN_PROCESS else None
     yield
+    if job_worker is not None:
+        jobs.worker.stop()
+        await job_worker
+    lag_monitor.cancel()
+    compute.pool.shutdown()
+    security.hasher.shutdown()
+    await llm.shutdown()
 
 
 app = FastAPI(title="LibraryHub API", version="1.0.0", lifespan=lifespan)
@@ -24,6 +44,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.CURSOR_HEADER],
 )
 
 # Static file serving for local storage
@@ -44,12 +65,24 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/metrics")
+async def health_metrics(db: AsyncSession = Depends(get_db)):
+    return {
+        "auth_cache": security.principals.stats(),
+        "password_hasher": security.hasher.stats(),
+        "recommendation_cache": recommendation_service.cache_stats(),
+        "recommendation_pool": compute.pool.stats(),
+        "llm_cache": llm_cache.cache.stats(),
+        "llm_scheduler": llm_scheduler.scheduler.stats(),
+        "sentiment": sentiment.stats(),
+        "jobs": await jobs.worker.stats(db),
+    }
+
+
 @app.get("/health/ollama")
 async def health_ollama():
-    import httpx
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            resp = await client.get(f"{settings.OLLAMA_BASE_URL}/api/tags")
-            return {"status": "ok", "models": resp.json()}
+        resp = await llm.http_client().get(f"{settings.OLLAMA_BASE_URL}/api/tags", timeout=5)
+        return {"status": "ok", "models": resp.json()}
     except Exception as e:
         return {"status": "error", "detail": str(e)}
@@ -1,5 +1,7 @@
 from app.models.user import User
 from app.models.book import Book
 from app.models.review import Review, Borrow, UserPreference
+from app.models.recommendation import PrecomputedDiscard, PrecomputedRecommendation
+from app.models.job import Job
 
-__all__ = ["User", "Book", "Review", "Borrow", "UserPreference"]
+__all__ = ["User", "Book", "Review", "Borrow", "UserPreference", "PrecomputedRecommendation", "PrecomputedDiscard", "Job"]
@@ -1,13 +1,15 @@
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import String, Text, DateTime, Integer, Float, func
+from sqlalchemy import DDL, String, Text, DateTime, Integer, Float, Index, event, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.core.config import settings
 from app.db import Base
 
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (Index("ix_books_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(500), index=True)
@@ -22,8 +24,71 @@ class Book(Base):
     cover_path: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     ai_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     review_consensus: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    avg_rating: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # Hash of the reviews the consensus was generated from
+    consensus_fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    avg_rating: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # rating_sum / rating_count
+    # Running review aggregates, maintained by app.services.ratings
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_1: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_2: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_3: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_4: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_5: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     reviews: Mapped[List["Review"]] = relationship(back_populates="book", cascade="all, delete-orphan")
     borrows: Mapped[List["Borrow"]] = relationship(back_populates="book", cascade="all, delete-orphan")
+
+
+# Keyset pagination index (app.core.pagination) for books tables created before it existed;
+# create_all only adds indexes along with a new table.
+event.listen(
+    Base.metadata, "after_create", DDL("CREATE INDEX IF NOT EXISTS ix_books_created_at_id ON books (created_at, id)")
+)
+
+# Columns added after the first release. create_all only creates missing tables, so on Postgres
+# they are added in place on the next startup; existing rating aggregates start at zero until
+# app.services.ratings.backfill() recomputes them.
+UPGRADE_DDL = (
+    "ALTER TABLE books ADD COLUMN IF NOT EXISTS consensus_fingerprint VARCHAR(64)",
+    *(
+        f"ALTER TABLE books ADD COLUMN IF NOT EXISTS {column} INTEGER NOT NULL DEFAULT 0"
+        for column in ("rating_sum", "rating_count", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5")
+    ),
+)
+for statement in UPGRADE_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+
+# Postgres full-text search (app.services.search): a weighted tsvector kept up to date by the
+# database as a generated column, its GIN index, and trigram indexes for the typo fallback.
+# Not mapped on the model. The statements are idempotent and run on every create_all, so
+# existing databases pick them up on the next startup.
+SEARCH_DOCUMENT = " || ".join(
+    f"setweight(to_tsvector('{settings.SEARCH_TEXT_CONFIG}', coalesce({column}, '')), '{weight}')"
+    for column, weight in (("title", "A"), ("author", "B"), ("genre", "C"), ("description", "D"))
+)
+SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # ADD COLUMN IF NOT EXISTS keeps an existing column as is: drop it first when it was
+    # generated with another SEARCH_TEXT_CONFIG, or queries and stored vectors would disagree
+    f"""DO $$ BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_attrdef d
+            JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum
+            WHERE d.adrelid = 'books'::regclass AND a.attname = 'search_vector'
+              AND position(quote_literal('{settings.SEARCH_TEXT_CONFIG}'::regconfig::text) || '::regconfig'
+                           IN pg_get_expr(d.adbin, d.adrelid)) = 0
+        ) THEN
+            ALTER TABLE books DROP COLUMN search_vector;
+        END IF;
+    END $$""",
+    f"ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({SEARCH_DOCUMENT}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_books_author_trgm ON books USING gin (author gin_trgm_ops)",
+)
+for statement in SEARCH_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class PrecomputedRecommendation(Base):
+    __tablename__ = "precomputed_recommendations"
+    __table_args__ = (Index("ix_precomputed_recommendations_user_rank", "user_id", "rank"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.id", ondelete="CASCADE"))
+    rank: Mapped[int] = mapped_column(Integer)
+    score: Mapped[float] = mapped_column(Float)
+    reason: Mapped[str] = mapped_column(String(500))
+    # When the inputs were read; set by the writer, not at insert time
+    computed_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class PrecomputedDiscard(Base):
+    """When a user's precomputed rows were last discarded (their history or preferences
+    changed). Rows computed before then are never served, even if written afterwards."""
+
+    __tablename__ = "precomputed_discards"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    discarded_at: Mapped[datetime] = mapped_column(DateTime)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, DateTime, Integer, Float, ForeignKey, Boolean, func
+from sqlalchemy import String, Text, DateTime, Integer, Float, ForeignKey, Boolean, DDL, Index, event, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -8,6 +8,7 @@ from app.db import Base
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (Index("ix_reviews_book_created_at", "book_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -15,6 +16,8 @@ class Review(Base):
     rating: Mapped[int] = mapped_column(Integer)  # 1-5
     text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     sentiment: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)  # positive/negative/neutral
+    # Who labelled it: "llm" or "local"; train-sentiment only learns from LLM labels
+    sentiment_source: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     user: Mapped["User"] = relationship(back_populates="reviews")
@@ -23,6 +26,7 @@ class Review(Base):
 
 class Borrow(Base):
     __tablename__ = "borrows"
+    __table_args__ = (Index("ix_borrows_user_borrowed_at", "user_id", "borrowed_at", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -44,3 +48,20 @@ class UserPreference(Base):
     favorite_authors: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
 
     user: Mapped["User"] = relationship(back_populates="preferences")
+
+
+# Keyset pagination indexes (app.core.pagination) for tables created before they existed;
+# create_all only adds indexes along with a new table.
+PAGINATION_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_reviews_book_created_at ON reviews (book_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_borrows_user_borrowed_at ON borrows (user_id, borrowed_at, id)",
+)
+for statement in PAGINATION_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement))
+
+# Added after the first release; create_all doesn't alter existing tables (see models/book.py)
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS sentiment_source VARCHAR(10)").execute_if(dialect="postgresql"),
+)
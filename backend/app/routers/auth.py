@@ -6,7 +6,7 @@ from sqlalchemy import select
 from app.db import get_db
 from app.models.user import User
 from app.schemas import UserCreate, UserOut, Token
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import Principal, get_current_user, hash_password, verify_password, create_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -24,7 +24,7 @@ async def register(data: UserCreate, db: AsyncSession = Depends(get_db)):
     user = User(
         email=data.email,
         username=data.username,
-        hashed_password=hash_password(data.password),
+        hashed_password=await hash_password(data.password),
     )
     db.add(user)
     await db.commit()
@@ -36,13 +36,19 @@ async def register(data: UserCreate, db: AsyncSession = Depends(get_db)):
 async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == form.username))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(form.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await verify_password(form.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:  # BCRYPT_ROUNDS changed since this password was hashed
+        user.hashed_password = new_hash
+        await db.commit()
 
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserOut)
-async def me(current_user: User = Depends(__import__("app.core.security", fromlist=["get_current_user"]).get_current_user)):
+async def me(current_user: Principal = Depends(get_current_user)):
     return current_user
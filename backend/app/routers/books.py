@@ -1,17 +1,20 @@
-import asyncio
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+import asyncio
+import json
 import os
+import tempfile
 
-from app.db import get_db
+from app.db import AsyncSessionLocal, get_db, load_many
 from app.models.book import Book
-from app.models.user import User
 from app.schemas import BookOut, BookCreate, BookUpdate
-from app.core.security import get_current_user
-from app.services import storage, llm
+from app.core import pagination
+from app.core.security import Principal, get_current_user
+from app.services import storage, llm, catalog, recommendations, ann, jobs, importer
+from app.services import search as search_service
 from app.core.config import settings
 
 router = APIRouter(prefix="/books", tags=["books"])
@@ -19,22 +22,24 @@ router = APIRouter(prefix="/books", tags=["books"])
 
 @router.get("", response_model=list[BookOut])
 async def list_books(
+    response: Response,
     search: Optional[str] = Query(None),
     genre: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     skip: int = 0,
     limit: int = 20,
     db: AsyncSession = Depends(get_db),
 ):
+    """Newest first, paged by cursor. Searches are ordered by relevance and paged with ``skip``."""
+    limit = pagination.clamp(limit)
     q = select(Book)
-    if search:
-        q = q.where(
-            Book.title.ilike(f"%{search}%") | Book.author.ilike(f"%{search}%")
-        )
     if genre:
         q = q.where(Book.genre.ilike(f"%{genre}%"))
-    q = q.offset(skip).limit(limit)
+    if search:
+        return await search_service.books(db, q, search, skip, limit)
+    q = pagination.keyset(db, q, Book.created_at, Book.id, cursor, skip, limit)
     result = await db.execute(q)
-    return result.scalars().all()
+    return pagination.respond(response, result.scalars().all(), limit, lambda b: (b.created_at, b.id))
 
 
 @router.get("/{book_id}", response_model=BookOut)
@@ -45,6 +50,63 @@ async def get_book(book_id: int, db: AsyncSession = Depends(get_db)):
     return book
 
 
+@router.get("/{book_id}/similar", response_model=list[BookOut])
+async def similar_books(
+    book_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+):
+    book = await db.get(Book, book_id)
+    if not book:
+        raise HTTPException(404, "Book not found")
+
+    await ann.index.ensure_ready(db)
+    hits = ann.index.search(book.id, catalog.book_text(book), limit)
+    if not hits:
+        return []
+    books = await load_many(db, Book, (i for i, _ in hits))
+    return [books[i] for i, _ in hits if i in books]
+
+
+@router.get("/{book_id}/summary/stream")
+async def stream_summary(book_id: int, db: AsyncSession = Depends(get_db)):
+    """Server-Sent Events: ``token`` events while the summary is generated, then ``done``
+    with the full text. A stored summary is sent as a single ``done`` event."""
+    book = await db.get(Book, book_id)
+    if not book:
+        raise HTTPException(404, "Book not found")
+    title, author, description, summary = book.title, book.author, book.description or "", book.ai_summary
+
+    def event(name: str, data: dict) -> str:
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    async def events():
+        if summary:
+            yield event("done", {"summary": summary})
+            return
+        parts = []
+        try:
+            async for token in llm.stream_book_summary(title, author, description):
+                parts.append(token)
+                yield event("token", {"token": token})
+        except Exception:
+            yield event("error", {"detail": "Summary generation failed"})
+            return
+        text = "".join(parts).strip()
+        async with AsyncSessionLocal() as session:
+            stored = await session.get(Book, book_id)
+            if stored:
+                stored.ai_summary = text
+                await session.commit()
+        yield event("done", {"summary": text})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("", response_model=BookOut, status_code=201)
 async def create_book(
     title: str = Form(...),
@@ -57,7 +119,7 @@ async def create_book(
     file: Optional[UploadFile] = File(None),
     cover: Optional[UploadFile] = File(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     file_path = None
     cover_path = None
@@ -80,13 +142,55 @@ async def create_book(
         cover_path=cover_path,
     )
     db.add(book)
+    await db.flush()
+    # Background: generate AI summary
+    await jobs.enqueue(db, "book_summary", book.id)
     await db.commit()
     await db.refresh(book)
+    catalog.index.upsert(book)
+    ann.index.changed(book.id)
+    recommendations.invalidate_all()
+    return book
 
-    # Background: generate AI summary
-    asyncio.create_task(_generate_summary(book.id, title, author, description or ""))
 
-    return book
+@router.post("/import")
+async def import_books(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+    update: bool = True,
+    current_user: Principal = Depends(get_current_user),
+):
+    """Bulk import from a CSV or JSONL request body, upserting on isbn.
+    Streams NDJSON events: per-row ``error``s, ``progress`` after each batch, then ``done``."""
+    if not current_user.is_admin:
+        raise HTTPException(403, "Admins only")
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "jsonl" if "json" in content_type else "csv"
+
+    # Spool the body first: StreamingResponse also reads from the client (disconnect detection),
+    # so the body can't be consumed lazily from inside the response
+    body = tempfile.SpooledTemporaryFile(max_size=settings.IMPORT_SPOOL_MAX_BYTES)
+    async for chunk in request.stream():
+        body.write(chunk)
+    body.seek(0)
+
+    async def chunks():
+        while chunk := await asyncio.to_thread(body.read, 1 << 16):
+            yield chunk
+
+    async def events():
+        try:
+            async with AsyncSessionLocal() as session:
+                async for event in importer.run(session, chunks(), format, update):
+                    yield json.dumps(event) + "\n"
+        finally:
+            body.close()
+            catalog.index.mark_stale()
+            ann.index.mark_stale()
+            recommendations.invalidate_all()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 
 @router.put("/{book_id}", response_model=BookOut)
@@ -94,7 +198,7 @@ async def update_book(
     book_id: int,
     data: BookUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     book = await db.get(Book, book_id)
     if not book:
@@ -105,6 +209,9 @@ async def update_book(
 
     await db.commit()
     await db.refresh(book)
+    catalog.index.upsert(book)
+    ann.index.changed(book.id)
+    recommendations.invalidate_all()
     return book
 
 
@@ -112,7 +219,7 @@ async def update_book(
 async def delete_book(
     book_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     if not current_user.is_admin:
         raise HTTPException(403, "Admins only")
@@ -121,11 +228,14 @@ async def delete_book(
         raise HTTPException(404, "Book not found")
     await db.delete(book)
     await db.commit()
+    catalog.index.remove(book_id)
+    ann.index.removed(book_id)
+    recommendations.invalidate_all()
 
 
 @router.get("/{book_id}/download")
 async def download_book(book_id: int, db: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user)):
+                        current_user: Principal = Depends(get_current_user)):
     book = await db.get(Book, book_id)
     if not book or not book.file_path:
         raise HTTPException(404, "File not found")
@@ -138,16 +248,3 @@ async def download_book(book_id: int, db: AsyncSession = Depends(get_db),
         raise HTTPException(404, "File not found on disk")
     return FileResponse(local_path, filename=os.path.basename(book.file_path))
 
-
-async def _generate_summary(book_id: int, title: str, author: str, description: str):
-    """Background task to generate AI summary for newly added book."""
-    from app.db import AsyncSessionLocal
-    try:
-        summary = await llm.generate_book_summary(title, author, description)
-        async with AsyncSessionLocal() as db:
-            book = await db.get(Book, book_id)
-            if book:
-                book.ai_summary = summary
-                await db.commit()
-    except Exception:
-        pass
@@ -1,14 +1,16 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.db import get_db
 from app.models.book import Book
 from app.models.review import Borrow
-from app.models.user import User
 from app.schemas import BorrowOut
-from app.core.security import get_current_user
+from app.core import pagination
+from app.core.security import Principal, get_current_user
+from app.services import recommendations, collaborative
 
 router = APIRouter(prefix="/borrows", tags=["borrows"])
 
@@ -17,7 +19,7 @@ router = APIRouter(prefix="/borrows", tags=["borrows"])
 async def borrow_book(
     book_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     book = await db.get(Book, book_id)
     if not book:
@@ -39,8 +41,11 @@ async def borrow_book(
     book.available_copies -= 1
     borrow = Borrow(user_id=current_user.id, book_id=book_id)
     db.add(borrow)
+    await recommendations.discard_precomputed(db, current_user.id)
     await db.commit()
     await db.refresh(borrow)
+    collaborative.index.add(current_user.id, book_id)
+    recommendations.invalidate_user(current_user.id)
 
     out = BorrowOut.model_validate(borrow)
     out.book_title = book.title
@@ -51,7 +56,7 @@ async def borrow_book(
 async def return_book(
     borrow_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     borrow = await db.get(Borrow, borrow_id)
     if not borrow:
@@ -68,8 +73,10 @@ async def return_book(
     if book:
         book.available_copies += 1
 
+    await recommendations.discard_precomputed(db, current_user.id)
     await db.commit()
     await db.refresh(borrow)
+    recommendations.invalidate_user(current_user.id)
 
     out = BorrowOut.model_validate(borrow)
     if book:
@@ -79,17 +86,28 @@ async def return_book(
 
 @router.get("/me", response_model=list[BorrowOut])
 async def my_borrows(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    skip: int = 0,
+    limit: int = 50,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
+    limit = pagination.clamp(limit)
+    # One query: each borrow with just its book's title
     result = await db.execute(
-        select(Borrow).where(Borrow.user_id == current_user.id).order_by(Borrow.borrowed_at.desc())
+        pagination.keyset(
+            db,
+            select(Borrow, Book.title)
+            .outerjoin(Book, Book.id == Borrow.book_id)
+            .where(Borrow.user_id == current_user.id),
+            Borrow.borrowed_at, Borrow.id, cursor, skip, limit,
+        )
     )
-    borrows = result.scalars().all()
+    rows = pagination.respond(response, result.all(), limit, lambda row: (row[0].borrowed_at, row[0].id))
     out_list = []
-    for b in borrows:
-        book = await db.get(Book, b.book_id)
-        item = BorrowOut.model_validate(b)
-        item.book_title = book.title if book else None
+    for borrow, title in rows:
+        item = BorrowOut.model_validate(borrow)
+        item.book_title = title
         out_list.append(item)
     return out_list
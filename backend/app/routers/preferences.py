@@ -4,9 +4,9 @@ from sqlalchemy import select
 
 from app.db import get_db
 from app.models.review import UserPreference
-from app.models.user import User
 from app.schemas import PreferenceUpdate
-from app.core.security import get_current_user
+from app.core.security import Principal, get_current_user
+from app.services import recommendations
 
 router = APIRouter(prefix="/preferences", tags=["preferences"])
 
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/preferences", tags=["preferences"])
 @router.get("")
 async def get_preferences(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     result = await db.execute(
         select(UserPreference).where(UserPreference.user_id == current_user.id)
@@ -29,7 +29,7 @@ async def get_preferences(
 async def update_preferences(
     data: PreferenceUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     result = await db.execute(
         select(UserPreference).where(UserPreference.user_id == current_user.id)
@@ -42,5 +42,7 @@ async def update_preferences(
         pref.favorite_genres = data.favorite_genres
     if data.favorite_authors is not None:
         pref.favorite_authors = data.favorite_authors
+    await recommendations.discard_precomputed(db, current_user.id)
     await db.commit()
+    recommendations.invalidate_user(current_user.id)
     return {"favorite_genres": pref.favorite_genres, "favorite_authors": pref.favorite_authors}
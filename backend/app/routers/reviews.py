@@ -1,30 +1,46 @@
-import asyncio
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 
 from app.db import get_db
 from app.models.book import Book
 from app.models.review import Review
 from app.models.user import User
 from app.schemas import ReviewCreate, ReviewOut
-from app.core.security import get_current_user
-from app.services import llm
+from app.core import pagination
+from app.core.security import Principal, get_current_user
+from app.core.config import settings
+from app.services import catalog, collaborative, jobs, ratings, recommendations, tasks
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
 
 @router.get("/book/{book_id}", response_model=list[ReviewOut])
-async def book_reviews(book_id: int, db: AsyncSession = Depends(get_db)):
+async def book_reviews(
+    book_id: int,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    skip: int = 0,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+):
+    limit = pagination.clamp(limit)
+    # One query: each review with just its author's username
     result = await db.execute(
-        select(Review).where(Review.book_id == book_id).order_by(Review.created_at.desc())
+        pagination.keyset(
+            db,
+            select(Review, User.username)
+            .outerjoin(User, User.id == Review.user_id)
+            .where(Review.book_id == book_id),
+            Review.created_at, Review.id, cursor, skip, limit,
+        )
     )
-    reviews = result.scalars().all()
+    rows = pagination.respond(response, result.all(), limit, lambda row: (row[0].created_at, row[0].id))
     out = []
-    for r in reviews:
-        user = await db.get(User, r.user_id)
-        item = ReviewOut.model_validate(r)
-        item.username = user.username if user else None
+    for review, username in rows:
+        item = ReviewOut.model_validate(review)
+        item.username = username
         out.append(item)
     return out
 
@@ -34,7 +50,7 @@ async def create_review(
     book_id: int,
     data: ReviewCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     if not 1 <= data.rating <= 5:
         raise HTTPException(400, "Rating must be between 1 and 5")
@@ -57,11 +73,17 @@ async def create_review(
         text=data.text,
     )
     db.add(review)
+    await db.flush()
+    avg_rating = await ratings.apply(db, book_id, data.rating, +1)
+    # Background: analyze sentiment; consensus (debounced per book)
+    await jobs.enqueue(db, "review_sentiment", review.id)
+    await tasks.enqueue_consensus(db, book_id)
     await db.commit()
     await db.refresh(review)
-
-    # Background: analyze sentiment + update avg rating + consensus
-    asyncio.create_task(_process_review(review.id, book_id, data.text or ""))
+    catalog.index.set_rating(book_id, avg_rating)
+    recommendations.invalidate_all()
+    if data.rating >= settings.CF_MIN_RATING:
+        collaborative.index.add(current_user.id, book_id)
 
     item = ReviewOut.model_validate(review)
     item.username = current_user.username
@@ -72,7 +94,7 @@ async def create_review(
 async def delete_review(
     review_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     review = await db.get(Review, review_id)
     if not review:
@@ -80,41 +102,9 @@ async def delete_review(
     if review.user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(403, "Not authorized")
     await db.delete(review)
+    avg_rating = await ratings.apply(db, review.book_id, review.rating, -1)
+    await tasks.enqueue_consensus(db, review.book_id)
     await db.commit()
+    catalog.index.set_rating(review.book_id, avg_rating)
+    recommendations.invalidate_all()
 
-
-async def _process_review(review_id: int, book_id: int, text: str):
-    """Background: sentiment analysis, update avg rating, generate consensus."""
-    from app.db import AsyncSessionLocal
-
-    try:
-        async with AsyncSessionLocal() as db:
-            # Sentiment
-            sentiment = await llm.analyze_review_sentiment(text)
-            review = await db.get(Review, review_id)
-            if review:
-                review.sentiment = sentiment
-                await db.commit()
-
-            # Update avg rating
-            result = await db.execute(
-                select(func.avg(Review.rating)).where(Review.book_id == book_id)
-            )
-            avg = result.scalar()
-            book = await db.get(Book, book_id)
-            if book and avg:
-                book.avg_rating = round(float(avg), 2)
-
-            # Generate consensus
-            reviews_result = await db.execute(
-                select(Review).where(Review.book_id == book_id).limit(10)
-            )
-            reviews = reviews_result.scalars().all()
-            review_dicts = [{"rating": r.rating, "text": r.text} for r in reviews]
-            consensus = await llm.generate_review_consensus(review_dicts)
-            if book:
-                book.review_consensus = consensus
-
-            await db.commit()
-    except Exception:
-        pass
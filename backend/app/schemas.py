@@ -62,6 +62,7 @@ class BookOut(BaseModel):
     ai_summary: Optional[str]
     review_consensus: Optional[str]
     avg_rating: Optional[float]
+    rating_count: int = 0
     created_at: datetime
 
     class Config:
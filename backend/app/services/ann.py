@@ -0,0 +1,269 @@
+"""
+Approximate nearest-neighbour index for "similar books".
+Book descriptions are vectorized exactly like the recommendation catalog,
+reduced with truncated SVD, and bucketed with an IVF (inverted file) coarse
+quantizer. The index is written as .npy files under INDEX_DIR/ann and
+memory-mapped, so every worker shares one copy and starts without rebuilding.
+Edited books are projected from their new text and deleted books filtered out
+until enough of the catalog has changed (or the index is old enough) to
+rebuild it in the background.
+"""
+import asyncio
+import os
+import pickle
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db import AsyncSessionLocal
+from app.models.book import Book
+from app.services.catalog import make_vectorizer
+
+_ARRAYS = ("vectors", "ids", "offsets", "centroids", "components", "sorted_ids", "sorted_pos")
+
+
+def build_arrays(docs: Iterable[Tuple[int, Optional[str]]], dim: int) -> Optional[dict]:
+    """Fit vectorizer + SVD + IVF lists for ``(book_id, text)`` pairs.
+
+    Returns ``None`` when the catalog has no usable text.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.preprocessing import normalize
+
+    docs = list(docs)
+    if not docs:
+        return None
+    ids = np.fromiter((d[0] for d in docs), dtype=np.int64, count=len(docs))
+    vectorizer = make_vectorizer()
+    try:
+        tfidf = vectorizer.fit_transform([d[1] or "" for d in docs])
+    except ValueError:
+        return None
+    if tfidf.shape[1] < 2:
+        return None
+
+    svd = TruncatedSVD(n_components=min(dim, tfidf.shape[1] - 1), random_state=0)
+    vectors = normalize(svd.fit_transform(tfidf)).astype(np.float32)
+
+    nlist = max(1, min(len(ids), int(np.sqrt(len(ids)))))
+    kmeans = MiniBatchKMeans(n_clusters=nlist, n_init=3, random_state=0, batch_size=4096)
+    labels = kmeans.fit_predict(vectors)
+    centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+
+    # Store vectors grouped by inverted list; offsets[i]:offsets[i+1] is list i
+    order = np.argsort(labels, kind="stable")
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+    ids = ids[order]
+    sort_idx = np.argsort(ids)
+
+    return {
+        "vectors": vectors[order],
+        "ids": ids,
+        "offsets": offsets,
+        "centroids": centroids,
+        "components": svd.components_.astype(np.float32),
+        "sorted_ids": ids[sort_idx],
+        "sorted_pos": sort_idx.astype(np.int64),
+        "vectorizer": vectorizer,
+    }
+
+
+def write_index(arrays: dict, root: Path) -> Path:
+    """Write a new index version and atomically point CURRENT at it."""
+    root.mkdir(parents=True, exist_ok=True)
+    version = f"{int(time.time() * 1000)}-{os.getpid()}"
+    target = root / version
+    target.mkdir()
+    for name in _ARRAYS:
+        np.save(target / f"{name}.npy", arrays[name])
+    with open(target / "vectorizer.pkl", "wb") as f:
+        pickle.dump(arrays["vectorizer"], f)
+
+    tmp = root / f"CURRENT.{version}"
+    tmp.write_text(version)
+    os.replace(tmp, root / "CURRENT")
+
+    # Keep the previous version around for workers still mapping it
+    versions = sorted(p for p in root.iterdir() if p.is_dir())
+    for old in versions[:-2]:
+        shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+class AnnIndex:
+    """Read side of the IVF index; reloads when another process publishes a new version."""
+
+    def __init__(self, root: Path, nprobe: int, dim: int, rebuild_ratio: float, rebuild_seconds: int):
+        self.root = root
+        self.nprobe = nprobe
+        self.dim = dim
+        self.rebuild_ratio = rebuild_ratio
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._build_lock = asyncio.Lock()
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+        self._arrays: dict = {}
+        self._vectorizer = None
+        # Changes since the loaded version was built, seen by this process
+        self._edited: set[int] = set()  # stored vector is out of date
+        self._removed: set[int] = set()
+        self._changes = 0
+        self._force = False
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._version is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+    @property
+    def stale(self) -> bool:
+        if not self.ready or self._force:
+            return True
+        if self.rebuild_seconds and time.time() - int(self._version.split("-")[0]) / 1000 > self.rebuild_seconds:
+            return True
+        return self._changes > self.rebuild_ratio * max(len(self._arrays["ids"]), 1)
+
+    def mark_stale(self):
+        """Rebuild on next use (e.g. after a bulk import)."""
+        self._force = True
+
+    def changed(self, book_id: int):
+        """A book was created or its description edited."""
+        with self._lock:
+            self._edited.add(book_id)
+            self._changes += 1
+
+    def removed(self, book_id: int):
+        with self._lock:
+            self._edited.discard(book_id)
+            self._removed.add(book_id)
+            self._changes += 1
+
+    def load(self) -> bool:
+        """Map the current on-disk version, if any. Returns True when loaded."""
+        current = self.root / "CURRENT"
+        self._checked_at = time.monotonic()
+        try:
+            version = current.read_text().strip()
+        except FileNotFoundError:
+            return False
+        if version == self._version:
+            return True
+        path = self.root / version
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        with open(path / "vectorizer.pkl", "rb") as f:
+            vectorizer = pickle.load(f)
+        with self._lock:
+            self._arrays, self._vectorizer, self._version = arrays, vectorizer, version
+        return True
+
+    async def ensure_ready(self, db: AsyncSession):
+        """Load the shared index, building it once if no worker has yet. A stale index keeps
+        serving while it is rebuilt in the background."""
+        if self.ready:
+            if time.monotonic() - self._checked_at > settings.ANN_RELOAD_CHECK_SECONDS:
+                self.load()
+            if self.stale and (self._rebuild_task is None or self._rebuild_task.done()):
+                self._rebuild_task = asyncio.create_task(self._rebuild_in_background())
+            return
+        if self.load():
+            return
+        async with self._build_lock:
+            if not self.load():
+                await self._build(db)
+
+    async def _rebuild_in_background(self):
+        async with AsyncSessionLocal() as db:
+            await self.rebuild(db)
+
+    async def rebuild(self, db: AsyncSession):
+        async with self._build_lock:
+            await self._build(db)
+
+    async def _build(self, db: AsyncSession):
+        # Changes recorded from here on may not be in the rows read below; keep them
+        with self._lock:
+            edited, removed, changes = set(self._edited), set(self._removed), self._changes
+            self._force = False
+        result = await db.stream(
+            select(Book.id, Book.description).execution_options(yield_per=settings.DB_STREAM_BATCH_SIZE)
+        )
+        docs = [tuple(row) async for row in result]
+        arrays = await asyncio.to_thread(build_arrays, docs, self.dim)
+        if arrays is None:
+            return
+        await asyncio.to_thread(write_index, arrays, self.root)
+        self.load()
+        with self._lock:
+            self._edited -= edited
+            self._removed -= removed
+            self._changes -= changes
+
+    def _vector_for(self, book_id: int, text: str) -> Optional[np.ndarray]:
+        a = self._arrays
+        i = int(np.searchsorted(a["sorted_ids"], book_id))
+        if book_id not in self._edited and i < len(a["sorted_ids"]) and a["sorted_ids"][i] == book_id:
+            return np.asarray(a["vectors"][a["sorted_pos"][i]])
+        # Book added or edited after the last build: project its text into the same space
+        if not text:
+            return None
+        vec = (self._vectorizer.transform([text]) @ a["components"].T).ravel()
+        norm = np.linalg.norm(vec)
+        return (vec / norm).astype(np.float32) if norm > 0 else None
+
+    def search(self, book_id: int, text: str, k: int) -> List[Tuple[int, float]]:
+        """Top ``k`` ``(book_id, cosine)`` neighbours of a book, excluding itself."""
+        with self._lock:
+            if not self.ready:
+                return []
+            a = self._arrays
+            query = self._vector_for(book_id, text)
+            if query is None:
+                return []
+
+            centroids = a["centroids"]
+            nprobe = min(self.nprobe, len(centroids))
+            probe = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+
+            cand_ids, cand_scores = [], []
+            for p in probe:
+                start, end = int(a["offsets"][p]), int(a["offsets"][p + 1])
+                if start == end:
+                    continue
+                cand_ids.append(a["ids"][start:end])
+                cand_scores.append(a["vectors"][start:end] @ query)
+            if not cand_ids:
+                return []
+
+            ids = np.concatenate(cand_ids)
+            scores = np.concatenate(cand_scores)
+            scores[ids == book_id] = -np.inf
+            if self._removed:
+                scores[np.isin(ids, list(self._removed))] = -np.inf
+            k = min(k, len(ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+index = AnnIndex(
+    root=Path(settings.INDEX_DIR) / "ann",
+    nprobe=settings.ANN_NPROBE,
+    dim=settings.ANN_DIM,
+    rebuild_ratio=settings.ANN_REBUILD_RATIO,
+    rebuild_seconds=settings.ANN_REBUILD_SECONDS,
+)
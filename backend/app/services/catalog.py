@@ -0,0 +1,313 @@
+"""
+Catalog index - in-process TF-IDF matrix and scoring columns for every book.
+Built once from the database, then kept current by the books router so a
+recommendation request never has to refit a vectorizer or load the books table.
+"""
+import asyncio
+import threading
+import time
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.book import Book
+from app.services import compute
+
+
+def book_text(book) -> str:
+    """Text the recommendation service vectorizes for a book."""
+    return book.description or ""
+
+
+def make_vectorizer(max_features: int = settings.CATALOG_TFIDF_MAX_FEATURES) -> TfidfVectorizer:
+    return TfidfVectorizer(max_features=max_features, stop_words="english")
+
+
+def normalize_key(value: Optional[str]) -> str:
+    """Case/whitespace-insensitive key used for genre and author matching."""
+    return (value or "").strip().lower()
+
+
+# Rating updates sent alongside a catalog version before a new version is cut
+MAX_RATING_CHANGES = 4096
+
+
+class CatalogSnapshot(NamedTuple):
+    """Row-aligned arrays for every catalog row, ready for vectorized scoring."""
+
+    ids: np.ndarray  # book id
+    alive: np.ndarray  # False for deleted or superseded rows
+    genres: np.ndarray  # genre code, -1 when missing
+    authors: np.ndarray  # author code, -1 when missing
+    ratings: np.ndarray  # avg_rating, 0.0 when unrated
+    has_text: np.ndarray  # book has a description
+    sims: Optional[np.ndarray]  # TF-IDF similarity to the requested history
+    profile: Optional[np.ndarray]  # normalized TF-IDF profile of the requested history
+    matrix: sparse.csr_matrix  # TF-IDF row per catalog row
+    version: int  # changes with the arrays above, except for in-place rating updates
+    rating_changes: Tuple[np.ndarray, np.ndarray]  # (rows, ratings) updated since ``version``
+    genre_codes: dict  # normalized genre -> code
+    author_codes: dict  # normalized author -> code
+    row_of: dict  # book id -> row
+
+    def rows(self, book_ids: Iterable[int]) -> np.ndarray:
+        """Row positions of ``book_ids`` that exist in this snapshot."""
+        n = len(self.ids)
+        found = [r for r in (self.row_of.get(i) for i in book_ids) if r is not None and r < n]
+        return np.asarray(found, dtype=np.int64)
+
+
+class CatalogIndex:
+    """Row-per-book TF-IDF matrix plus genre/author/rating columns.
+
+    New and updated books are transformed with the already-fitted vocabulary
+    and appended; the rows they replace are masked out. Once enough of the
+    catalog has changed (or the refresh interval passes) the index is marked
+    stale and refitted from the database on next use.
+    """
+
+    def __init__(self, max_features: int, refit_ratio: float, refresh_seconds: int):
+        self.max_features = max_features
+        self.refit_ratio = refit_ratio
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._build_lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._vectorizer: Optional[TfidfVectorizer] = None
+        self._matrix = sparse.csr_matrix((0, 0))
+        self._ids = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._genres = np.empty(0, dtype=np.int32)
+        self._authors = np.empty(0, dtype=np.int32)
+        self._ratings = np.empty(0, dtype=np.float64)
+        self._has_text = np.empty(0, dtype=bool)
+        self._genre_codes: dict[str, int] = {}
+        self._author_codes: dict[str, int] = {}
+        self._row_of: dict[int, int] = {}
+        # book id -> (text, genre, author, avg_rating) to append, or None to drop
+        self._pending: dict[int, Optional[tuple]] = {}
+        self._rerated: Optional[dict[int, Optional[float]]] = None  # set_rating calls during a rebuild
+        self._changes = 0
+        self.version = 0
+        self._rating_changes: dict[int, float] = {}  # row -> avg_rating set since the version changed
+        self.built_at: Optional[float] = None
+
+    @property
+    def stale(self) -> bool:
+        if self.built_at is None:
+            return True
+        if self.refresh_seconds and time.monotonic() - self.built_at > self.refresh_seconds:
+            return True
+        return self._changes > self.refit_ratio * max(len(self._row_of), 1)
+
+    def mark_stale(self):
+        """Force a rebuild from the database on next use."""
+        self.built_at = None
+
+    async def ensure_built(self, db: AsyncSession):
+        if not self.stale:
+            return
+        async with self._build_lock:
+            if self.stale:
+                # Changes queued now are committed, so the rows read below include them; anything
+                # that arrives while reading and fitting is replayed onto the new index
+                with self._lock:
+                    queued = dict(self._pending)
+                    self._rerated = {}
+                try:
+                    result = await db.stream(
+                        select(Book.id, Book.description, Book.genre, Book.author, Book.avg_rating)
+                        .execution_options(yield_per=settings.DB_STREAM_BATCH_SIZE)
+                    )
+                    rows = [tuple(row) async for row in result]
+                    await compute.pool.run_local(self.build, rows, queued)
+                finally:
+                    self._rerated = None
+
+    def build(
+        self,
+        rows: Iterable[Tuple[int, Optional[str], Optional[str], Optional[str], Optional[float]]],
+        queued: Optional[dict] = None,
+    ):
+        """Fit the vectorizer on the full catalog and replace every column.
+
+        ``rows`` are ``(id, description, genre, author, avg_rating)`` tuples. The new
+        columns are built aside and swapped in at once; queued changes are kept and
+        applied on top, except the entries of ``queued`` that ``rows`` already reflect.
+        """
+        rows = list(rows)
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        texts = [r[1] or "" for r in rows]
+
+        vectorizer = make_vectorizer(self.max_features)
+        try:
+            matrix = vectorizer.fit_transform(texts).tocsr()
+        except ValueError:
+            # Empty vocabulary (no descriptions yet)
+            vectorizer = None
+            matrix = sparse.csr_matrix((len(rows), 0))
+        genre_codes: dict[str, int] = {}
+        author_codes: dict[str, int] = {}
+        genres = np.array([self._code(genre_codes, r[2]) for r in rows], dtype=np.int32)
+        authors = np.array([self._code(author_codes, r[3]) for r in rows], dtype=np.int32)
+        ratings = np.array([r[4] or 0.0 for r in rows], dtype=np.float64)
+        has_text = np.array([bool(t) for t in texts], dtype=bool)
+        row_of = {int(book_id): row for row, book_id in enumerate(ids)}
+
+        with self._lock:
+            self._vectorizer = vectorizer
+            self._matrix = matrix
+            self._ids = ids
+            self._alive = np.ones(len(ids), dtype=bool)
+            self._genres = genres
+            self._authors = authors
+            self._ratings = ratings
+            self._has_text = has_text
+            self._genre_codes = genre_codes
+            self._author_codes = author_codes
+            self._row_of = row_of
+            queued = queued or {}
+            self._pending = {
+                book_id: fields
+                for book_id, fields in self._pending.items()
+                if book_id not in queued or queued[book_id] is not fields
+            }
+            for book_id, avg_rating in (self._rerated or {}).items():
+                row = row_of.get(book_id)
+                if row is not None:
+                    ratings[row] = avg_rating or 0.0
+            self._changes = len(self._pending)
+            self._new_version()
+            self._flush()
+            self.built_at = time.monotonic()
+
+    @staticmethod
+    def _code(codes: dict, value: Optional[str]) -> int:
+        key = normalize_key(value)
+        if not key:
+            return -1
+        return codes.setdefault(key, len(codes))
+
+    def upsert(self, book: Book):
+        """Queue a created or updated book; it is vectorized on next query."""
+        with self._lock:
+            self._pending[book.id] = (book_text(book), book.genre, book.author, book.avg_rating)
+            self._changes += 1
+
+    def set_rating(self, book_id: int, avg_rating: Optional[float]):
+        """Update a book's rating column in place (no re-vectorizing)."""
+        with self._lock:
+            fields = self._pending.get(book_id)
+            if fields is not None:
+                self._pending[book_id] = (*fields[:3], avg_rating)
+            row = self._row_of.get(book_id)
+            if row is not None:
+                # Ratings change with every review: record a delta rather than a new version, so
+                # process-pool workers (compute.ComputePool.run_shared) keep their catalog copy
+                self._ratings[row] = self._rating_changes[row] = avg_rating or 0.0
+                if len(self._rating_changes) > MAX_RATING_CHANGES:
+                    self._new_version()
+            if self._rerated is not None:
+                self._rerated[book_id] = avg_rating
+
+    def remove(self, book_id: int):
+        with self._lock:
+            self._pending[book_id] = None  # also drops the row from an index being rebuilt
+            row = self._row_of.pop(book_id, None)
+            if row is not None:
+                self._alive[row] = False
+                self._changes += 1
+                self._new_version()
+
+    def _new_version(self):
+        self.version += 1
+        self._rating_changes = {}
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        self._new_version()
+        for book_id in pending:
+            old = self._row_of.pop(book_id, None)
+            if old is not None:
+                self._alive[old] = False
+        book_ids = [book_id for book_id, fields in pending.items() if fields is not None]
+        if not book_ids:
+            return
+        fields = [pending[i] for i in book_ids]
+        texts = [f[0] for f in fields]
+
+        if self._vectorizer is not None:
+            rows = self._vectorizer.transform(texts)
+        else:
+            rows = sparse.csr_matrix((len(texts), self._matrix.shape[1]))
+
+        start = self._matrix.shape[0]
+        self._matrix = sparse.vstack([self._matrix, rows], format="csr")
+        self._ids = np.concatenate([self._ids, np.asarray(book_ids, dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, np.ones(len(book_ids), dtype=bool)])
+        self._genres = np.concatenate([
+            self._genres,
+            np.array([self._code(self._genre_codes, f[1]) for f in fields], dtype=np.int32),
+        ])
+        self._authors = np.concatenate([
+            self._authors,
+            np.array([self._code(self._author_codes, f[2]) for f in fields], dtype=np.int32),
+        ])
+        self._ratings = np.concatenate([self._ratings, np.array([f[3] or 0.0 for f in fields])])
+        self._has_text = np.concatenate([self._has_text, np.array([bool(t) for t in texts], dtype=bool)])
+        for offset, book_id in enumerate(book_ids):
+            self._row_of[book_id] = start + offset
+
+    def snapshot(self, history_ids: Iterable[int] = (), similarities: bool = True) -> CatalogSnapshot:
+        """Current scoring columns, plus TF-IDF similarity to ``history_ids``.
+
+        The history is collapsed into one normalized profile vector, so the
+        whole catalog is scored with a single sparse matrix-vector product;
+        with ``similarities=False`` only the profile is returned, for the
+        caller to multiply. Arrays are shared, not copied: treat the snapshot
+        as read-only.
+        """
+        with self._lock:
+            self._flush()
+            rows = [self._row_of[i] for i in history_ids if i in self._row_of]
+            profile = sims = None
+            if rows and self._matrix.shape[1] > 0:
+                profile = normalize(np.asarray(self._matrix[rows].sum(axis=0))).ravel()
+                if similarities:
+                    sims = self._matrix @ profile
+            return CatalogSnapshot(
+                ids=self._ids,
+                alive=self._alive,
+                genres=self._genres,
+                authors=self._authors,
+                ratings=self._ratings,
+                has_text=self._has_text,
+                sims=sims,
+                profile=profile,
+                matrix=self._matrix,
+                version=self.version,
+                rating_changes=(
+                    np.fromiter(self._rating_changes.keys(), dtype=np.int64, count=len(self._rating_changes)),
+                    np.fromiter(self._rating_changes.values(), dtype=np.float64, count=len(self._rating_changes)),
+                ),
+                genre_codes=self._genre_codes,
+                author_codes=self._author_codes,
+                row_of=self._row_of,
+            )
+
+
+index = CatalogIndex(
+    max_features=settings.CATALOG_TFIDF_MAX_FEATURES,
+    refit_ratio=settings.CATALOG_REFIT_RATIO,
+    refresh_seconds=settings.CATALOG_REFRESH_SECONDS,
+)
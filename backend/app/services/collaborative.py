@@ -0,0 +1,123 @@
+"""
+Item-item collaborative filtering.
+Keeps a sparse book x book co-occurrence matrix over user interactions
+(borrows, plus reviews at or above CF_MIN_RATING). New interactions update
+it incrementally; scoring a user only touches the rows of their own books.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.review import Borrow, Review
+from app.services import compute
+
+
+class ItemCooccurrence:
+    """Sparse co-occurrence counts with cosine-normalized item similarity.
+
+    ``sim(i, j) = co(i, j) / sqrt(n(i) * n(j))`` where ``n`` is the number
+    of users who interacted with a book.
+    """
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._build_lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._history: dict[int, set[int]] = defaultdict(set)  # user -> books
+        self._co: dict[int, Counter] = defaultdict(Counter)  # book -> {book: co-count}
+        self._count: Counter = Counter()  # book -> users
+        self.built_at: Optional[float] = None
+
+    @property
+    def stale(self) -> bool:
+        if self.built_at is None:
+            return True
+        return bool(self.refresh_seconds) and time.monotonic() - self.built_at > self.refresh_seconds
+
+    def mark_stale(self):
+        """Force a rebuild from the database on next use."""
+        self.built_at = None
+
+    async def ensure_built(self, db: AsyncSession):
+        if not self.stale:
+            return
+        async with self._build_lock:
+            if self.stale:
+                interactions = union(
+                    select(Borrow.user_id, Borrow.book_id),
+                    select(Review.user_id, Review.book_id).where(Review.rating >= settings.CF_MIN_RATING),
+                )
+                result = await db.stream(
+                    interactions.execution_options(yield_per=settings.DB_STREAM_BATCH_SIZE)
+                )
+                history: dict[int, set[int]] = defaultdict(set)
+                async for user_id, book_id in result:
+                    history[user_id].add(book_id)
+                await compute.pool.run_local(self._install, history)
+
+    def build(self, interactions: Iterable[Tuple[int, int]]):
+        """Rebuild from ``(user_id, book_id)`` pairs."""
+        history: dict[int, set[int]] = defaultdict(set)
+        for user_id, book_id in interactions:
+            history[user_id].add(book_id)
+        self._install(history)
+
+    def _install(self, history: dict[int, set[int]]):
+        co: dict[int, Counter] = defaultdict(Counter)
+        count: Counter = Counter()
+        for books in history.values():
+            count.update(books)
+            for i in books:
+                row = co[i]
+                for j in books:
+                    if i != j:
+                        row[j] += 1
+
+        with self._lock:
+            self._history, self._co, self._count = history, co, count
+            self.built_at = time.monotonic()
+
+    def add(self, user_id: int, book_id: int):
+        """Record one new interaction; cost is O(size of the user's history)."""
+        with self._lock:
+            if self.built_at is None:
+                return
+            books = self._history[user_id]
+            if book_id in books:
+                return
+            row = self._co[book_id]
+            for other in books:
+                row[other] += 1
+                self._co[other][book_id] += 1
+            self._count[book_id] += 1
+            books.add(book_id)
+
+    def history(self, user_id: int) -> set[int]:
+        with self._lock:
+            return set(self._history.get(user_id, ()))
+
+    def scores(self, history_ids: Iterable[int]) -> dict[int, float]:
+        """Mean item-item similarity of each neighbouring book to the history."""
+        with self._lock:
+            history = [h for h in history_ids if self._count.get(h)]
+            if not history:
+                return {}
+            totals: dict[int, float] = defaultdict(float)
+            for h in history:
+                n_h = self._count[h]
+                for j, c in self._co.get(h, {}).items():
+                    totals[j] += c / math.sqrt(n_h * self._count[j])
+            return {j: s / len(history) for j, s in totals.items()}
+
+
+index = ItemCooccurrence(refresh_seconds=settings.CF_REFRESH_SECONDS)
@@ -0,0 +1,150 @@
+"""
+CPU pool for recommendation work - keeps TF-IDF fitting and scoring off the event loop.
+Swap via RECOMMENDATION_EXECUTOR: thread | process
+
+thread:  NumPy/SciPy release the GIL for the heavy array work; inputs are shared.
+process: per-call inputs are pickled to worker processes, and large shared
+         inputs (the catalog columns) are sent to each worker once per version
+         via run_shared; index builds still use a thread because they mutate
+         in-process state.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+# In process-pool workers: name -> (key, value) last sent by ComputePool.run_shared
+_worker_shared: dict = {}
+
+
+class SharedValueMissing(Exception):
+    """The worker doesn't hold the requested version of a shared value."""
+
+
+def _call_with_shared(fn: Callable, name: str, key: Any, value: Any, args: tuple) -> Any:
+    if value is not None:
+        _worker_shared[name] = (key, value)
+    held = _worker_shared.get(name)
+    if held is None or held[0] != key:
+        raise SharedValueMissing(name)
+    return fn(held[1], *args)
+
+
+class ComputePool:
+    def __init__(self, kind: str, workers: int, max_concurrency: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[Executor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queued = 0
+        self.in_flight = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.shared_sends = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.loop_lag_ms = 0.0
+        self.max_loop_lag_ms = 0.0
+
+    def _ensure(self):
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.workers, thread_name_prefix="recommend")
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = self._threads
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run a pure function on the configured executor (args must pickle in process mode)."""
+        self._ensure()
+        return await self._submit(self._executor, fn, *args)
+
+    async def run_shared(self, fn: Callable, name: str, key: Any, value: Any, *args: Any) -> Any:
+        """``run(fn, value, *args)``, where ``value`` is large and changes rarely.
+
+        In process mode each worker keeps the last ``value`` it was sent under ``name``;
+        calls with the same ``key`` pickle only ``args``, and a worker holding an older
+        key is sent the new value on a retry.
+        """
+        if self.kind != "process":
+            return await self.run(fn, value, *args)
+        try:
+            return await self.run(_call_with_shared, fn, name, key, None, args)
+        except SharedValueMissing:
+            self.shared_sends += 1
+            return await self.run(_call_with_shared, fn, name, key, value, args)
+
+    async def run_local(self, fn: Callable, *args: Any) -> Any:
+        """Run a function that touches in-process state; always on a thread."""
+        self._ensure()
+        return await self._submit(self._threads, fn, *args)
+
+    async def _submit(self, executor: Executor, fn: Callable, *args: Any) -> Any:
+        queued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        started = time.perf_counter()
+        self.wait_seconds += started - queued_at
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, partial(fn, *args))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.run_seconds += time.perf_counter() - started
+            self._semaphore.release()
+
+    async def monitor_loop_lag(self, interval: float = 0.25):
+        """Background task: how late the event loop wakes up from a timer."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.loop_lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.max_loop_lag_ms = max(self.max_loop_lag_ms, self.loop_lag_ms)
+
+    def shutdown(self):
+        if self._executor is not None and self._executor is not self._threads:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._threads = self._semaphore = None
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "shared_sends": self.shared_sends,
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "loop_lag_ms": round(self.loop_lag_ms, 2),
+            "max_loop_lag_ms": round(self.max_loop_lag_ms, 2),
+        }
+
+
+pool = ComputePool(
+    kind=settings.RECOMMENDATION_EXECUTOR,
+    workers=settings.RECOMMENDATION_WORKERS,
+    max_concurrency=settings.RECOMMENDATION_MAX_CONCURRENCY,
+)
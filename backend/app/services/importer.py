@@ -0,0 +1,216 @@
+"""
+Bulk book import from CSV or JSONL.
+The input is decoded and parsed incrementally, so memory stays flat however
+large the upload is. Valid rows are written IMPORT_BATCH_SIZE at a time with one
+INSERT ... ON CONFLICT (isbn) per batch and their summary jobs are queued with
+one more INSERT. A batch the database rejects is retried row by row so only
+the offending rows are reported.
+
+run() yields progress events (plain dicts) for the API to stream as NDJSON:
+    {"event": "error", "line": 12, "error": "..."}
+    {"event": "progress", "rows": 5000, "written": 4990, "errors": 10}
+    {"event": "done", "rows": ..., "written": ..., "errors": ..., "seconds": ...}
+"""
+import codecs
+import csv
+import io
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import case
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db import dialect_insert
+from app.models.book import Book
+from app.schemas import BookCreate
+from app.services import jobs
+
+FORMATS = ("csv", "jsonl")
+FIELDS = tuple(BookCreate.model_fields)
+UPDATABLE = ("title", "author", "description", "genre", "year")
+# Longest value each string column accepts, so one long field fails its row rather than its batch
+MAX_LENGTHS = {
+    name: Book.__table__.c[name].type.length
+    for name in FIELDS
+    if getattr(Book.__table__.c[name].type, "length", None)
+}
+
+Parsed = Tuple[int, Optional[dict], Optional[str]]  # (line, raw record, parse error)
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def parse(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Parsed]:
+    line_no = 0
+    if fmt == "jsonl":
+        async for line in _lines(chunks):
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "expected a JSON object"
+                continue
+            yield line_no, record, None
+        return
+
+    header = None
+    pending: List[str] = []
+    quotes = 0
+    start = 0
+    async for line in _lines(chunks):
+        line_no += 1
+        if not pending:
+            start = line_no
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:  # a quoted field continues on the next line
+            continue
+        record = next(csv.reader(io.StringIO("\n".join(pending))), [])
+        pending, quotes = [], 0
+        if not any(field.strip() for field in record):
+            continue
+        if header is None:
+            header = [field.strip().lower() for field in record]
+            continue
+        if len(record) != len(header):
+            yield start, None, f"expected {len(header)} fields, got {len(record)}"
+            continue
+        yield start, dict(zip(header, record)), None
+    if pending:
+        yield start, None, "unterminated quoted field"
+
+
+def validate(record: dict) -> dict:
+    """Map a raw record to insert values; raises ValueError with a readable message."""
+    data = {}
+    for name in FIELDS:
+        value = record.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in (None, ""):
+            data[name] = value
+    try:
+        book = BookCreate(**data)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    values = book.model_dump()
+    for name, limit in MAX_LENGTHS.items():
+        if values.get(name) and len(values[name]) > limit:
+            raise ValueError(f"{name}: longer than {limit} characters")
+    if values["total_copies"] < 0:
+        raise ValueError("total_copies: must not be negative")
+    values["available_copies"] = values["total_copies"]
+    return values
+
+
+def _statement(db: AsyncSession, rows: List[dict], update: bool):
+    stmt = dialect_insert(db)(Book).values(rows)
+    if update:
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["isbn"],
+            set_={
+                **{name: getattr(excluded, name) for name in UPDATABLE},
+                # A new description needs a new summary
+                "ai_summary": case(
+                    (Book.description.is_distinct_from(excluded.description), None), else_=Book.ai_summary
+                ),
+            },
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["isbn"])
+    return stmt.returning(Book.id)
+
+
+async def _write(db: AsyncSession, rows: List[Tuple[int, dict]], update: bool) -> Tuple[int, List[dict]]:
+    """Insert one batch; returns ``(rows written, error events)``."""
+    # Postgres rejects an upsert that touches the same row twice; the last occurrence wins
+    by_isbn: Dict[str, Tuple[int, dict]] = {}
+    batch = []
+    for line, values in rows:
+        if values["isbn"]:
+            by_isbn[values["isbn"]] = (line, values)
+        else:
+            batch.append((line, values))
+    batch.extend(by_isbn.values())
+
+    try:
+        ids = (await db.execute(_statement(db, [v for _, v in batch], update))).scalars().all()
+        await jobs.enqueue_many(db, "book_summary", ids)
+        await db.commit()
+        return len(ids), []
+    except DBAPIError:
+        await db.rollback()
+
+    written, errors = 0, []
+    for line, values in batch:
+        try:
+            ids = (await db.execute(_statement(db, [values], update))).scalars().all()
+            await jobs.enqueue_many(db, "book_summary", ids)
+            await db.commit()
+            written += len(ids)
+        except DBAPIError as e:
+            await db.rollback()
+            errors.append({"event": "error", "line": line, "error": str(e.orig).splitlines()[0][:300]})
+    return written, errors
+
+
+async def run(
+    db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str, update: bool = True
+) -> AsyncIterator[dict]:
+    started = time.monotonic()
+    rows = written = errors = 0
+    batch: List[Tuple[int, dict]] = []
+
+    async def flush():
+        nonlocal written, errors
+        count, failed = await _write(db, batch, update)
+        batch.clear()
+        written += count
+        errors += len(failed)
+        return failed
+
+    async for line, record, error in parse(chunks, fmt):
+        rows += 1
+        if error is None:
+            try:
+                batch.append((line, validate(record)))
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            errors += 1
+            yield {"event": "error", "line": line, "error": error}
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            for event in await flush():
+                yield event
+            yield {"event": "progress", "rows": rows, "written": written, "errors": errors}
+    if batch:
+        for event in await flush():
+            yield event
+    yield {
+        "event": "done",
+        "rows": rows,
+        "written": written,
+        "errors": errors,
+        "seconds": round(time.monotonic() - started, 2),
+    }
@@ -0,0 +1,325 @@
+"""
+DB-backed background jobs.
+Request handlers enqueue a row in the same transaction as the change that
+triggers it; a worker pool claims due rows, runs the registered handler and
+retries failures with exponential backoff. LLM calls made by handlers use
+the scheduler's background lane. Jobs survive restarts: rows left
+"running" by a dead worker are released after JOB_LOCK_TIMEOUT_SECONDS.
+
+The worker runs inside the API process (JOB_WORKER_IN_PROCESS) or on its own:
+
+    python -m app.cli worker
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from sqlalchemy import case, delete, event, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db import AsyncSessionLocal, dialect_insert
+from app.models.job import Job
+from app.services import llm_scheduler
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Optional[int], dict], Awaitable[None]]
+
+
+@dataclass
+class JobType:
+    name: str
+    fn: Handler
+    concurrency: int
+    max_attempts: int
+
+
+registry: Dict[str, JobType] = {}
+
+
+def handler(name: str, concurrency: int = 2, max_attempts: Optional[int] = None):
+    """Register ``fn(entity_id, payload)`` for jobs of type ``name``.
+
+    ``JOB_CONCURRENCY`` overrides the per-type concurrency, e.g. ``{"book_summary": 4}``.
+    """
+    def register(fn: Handler) -> Handler:
+        registry[name] = JobType(
+            name=name,
+            fn=fn,
+            concurrency=settings.JOB_CONCURRENCY.get(name, concurrency),
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        )
+        return fn
+    return register
+
+
+async def enqueue(
+    db: AsyncSession,
+    type: str,
+    entity_id: Optional[int] = None,
+    payload: Optional[dict] = None,
+    delay: float = 0,
+    dedupe: bool = True,
+    max_delay: Optional[float] = None,
+):
+    """Queue a job in the caller's transaction; it becomes visible on commit.
+
+    With ``dedupe`` a job is dropped if one of the same type for the same entity is
+    already pending. With ``max_delay`` as well, the trigger is debounced instead: the
+    pending job is pushed back to run ``delay`` seconds from now, but no later than
+    ``max_delay`` seconds after the first trigger.
+    """
+    now = datetime.utcnow()
+    values = _job_values(type, entity_id, payload, now + timedelta(seconds=delay), dedupe)
+    values["not_after"] = now + timedelta(seconds=max_delay) if max_delay is not None else None
+    stmt = dialect_insert(db)(Job).values(**values)
+    if max_delay is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dedupe_key"],
+            set_={
+                "run_after": case(
+                    (stmt.excluded.run_after < Job.not_after, stmt.excluded.run_after),
+                    else_=Job.not_after,
+                )
+            },
+        ).returning(Job.not_after)
+        # A debounced trigger keeps the pending job's not_after; only a new row carries ours
+        inserted = (await db.execute(stmt)).scalar() == values["not_after"]
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["dedupe_key"])
+        inserted = (await db.execute(stmt)).rowcount > 0
+    if inserted:
+        worker.enqueued[type] += 1
+    # Wake an in-process worker once the row is committed
+    event.listen(db.sync_session, "after_commit", lambda session: worker.notify(), once=True)
+
+
+async def enqueue_many(db: AsyncSession, type: str, entity_ids: Iterable[int], delay: float = 0):
+    """Queue one job per entity in a single INSERT, skipping entities with one pending."""
+    run_after = datetime.utcnow() + timedelta(seconds=delay)
+    values = [_job_values(type, entity_id, None, run_after, True) for entity_id in entity_ids]
+    if not values:
+        return
+    result = await db.execute(
+        dialect_insert(db)(Job).values(values).on_conflict_do_nothing(index_elements=["dedupe_key"])
+    )
+    worker.enqueued[type] += max(result.rowcount, 0)
+    event.listen(db.sync_session, "after_commit", lambda session: worker.notify(), once=True)
+
+
+def _job_values(type: str, entity_id: Optional[int], payload: Optional[dict], run_after: datetime, dedupe: bool) -> dict:
+    return {
+        "type": type,
+        "entity_id": entity_id,
+        "dedupe_key": f"{type}:{entity_id}" if dedupe and entity_id is not None else None,
+        "payload": payload or {},
+        "status": "pending",
+        "attempts": 0,
+        "max_attempts": registry[type].max_attempts if type in registry else settings.JOB_MAX_ATTEMPTS,
+        "run_after": run_after,
+        "not_after": None,
+    }
+
+
+def _backoff(attempts: int) -> float:
+    delay = min(settings.JOB_RETRY_MAX_SECONDS, settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class Worker:
+    def __init__(self):
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake: Optional[asyncio.Event] = None
+        self._running: Dict[str, int] = defaultdict(int)
+        self._running_ids: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = False
+        self.enqueued: Dict[str, int] = defaultdict(int)
+        self.succeeded: Dict[str, int] = defaultdict(int)
+        self.retried: Dict[str, int] = defaultdict(int)
+        self.failed: Dict[str, int] = defaultdict(int)
+        self.wait_seconds: Dict[str, float] = defaultdict(float)
+        self.run_seconds: Dict[str, float] = defaultdict(float)
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run_forever(self, drain_timeout: float = 10.0):
+        """Claim and run jobs until :meth:`stop`; then wait up to ``drain_timeout`` for running jobs."""
+        self._wake = asyncio.Event()
+        self._stopping = False
+        await self._maintenance(startup=True)
+        last_maintenance = time.monotonic()
+        try:
+            while not self._stopping:
+                if time.monotonic() - last_maintenance > 60:
+                    await self._maintenance()
+                    last_maintenance = time.monotonic()
+                try:
+                    claimed = await self._claim()
+                except Exception:
+                    logger.exception("Job claim failed")
+                    claimed = 0
+                if claimed:
+                    continue
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            if self._tasks:
+                await asyncio.wait(self._tasks, timeout=drain_timeout)
+        finally:
+            self._wake = None
+
+    def stop(self):
+        self._stopping = True
+        self.notify()
+
+    async def _claim(self) -> int:
+        free = {
+            name: jt.concurrency - self._running[name]
+            for name, jt in registry.items()
+            if jt.concurrency > self._running[name]
+        }
+        if not free:
+            return 0
+        now = datetime.utcnow()
+        claimed = []
+        async with AsyncSessionLocal() as db:
+            for name, slots in free.items():
+                ids = (
+                    await db.execute(
+                        select(Job.id)
+                        .where(Job.status == "pending", Job.type == name, Job.run_after <= now)
+                        .order_by(Job.run_after, Job.id)
+                        .limit(slots)
+                        .with_for_update(skip_locked=True)
+                    )
+                ).scalars().all()
+                if not ids:
+                    continue
+                await db.execute(
+                    update(Job)
+                    .where(Job.id.in_(ids), Job.status == "pending")
+                    .values(
+                        status="running",
+                        locked_by=self.id,
+                        locked_at=now,
+                        attempts=Job.attempts + 1,
+                        dedupe_key=None,
+                    )
+                )
+                rows = (
+                    await db.execute(
+                        select(Job).where(Job.id.in_(ids), Job.locked_by == self.id, Job.locked_at == now)
+                    )
+                ).scalars().all()
+                claimed.extend(rows)
+            await db.commit()
+
+        for job in claimed:
+            self._running[job.type] += 1
+            self._running_ids.add(job.id)
+            self.wait_seconds[job.type] += (now - job.run_after).total_seconds()
+            task = asyncio.create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return len(claimed)
+
+    async def _execute(self, job: Job):
+        started = time.perf_counter()
+        try:
+            with llm_scheduler.background():
+                await registry[job.type].fn(job.entity_id, job.payload)
+        except Exception as e:
+            logger.exception("Job %s %s failed (attempt %s)", job.type, job.id, job.attempts)
+            await self._finish(job, error=f"{type(e).__name__}: {e}"[:2000])
+        else:
+            await self._finish(job)
+        finally:
+            self._running[job.type] -= 1
+            self._running_ids.discard(job.id)
+            self.run_seconds[job.type] += time.perf_counter() - started
+            self.notify()
+
+    async def _finish(self, job: Job, error: Optional[str] = None):
+        values = {"locked_by": None, "locked_at": None, "last_error": error}
+        if error is None:
+            values.update(status="done", finished_at=datetime.utcnow())
+            self.succeeded[job.type] += 1
+        elif job.attempts < job.max_attempts:
+            values.update(status="pending", run_after=datetime.utcnow() + timedelta(seconds=_backoff(job.attempts)))
+            self.retried[job.type] += 1
+        else:
+            values.update(status="failed", finished_at=datetime.utcnow())
+            self.failed[job.type] += 1
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Job).where(Job.id == job.id).values(**values))
+            await db.commit()
+
+    async def _maintenance(self, startup: bool = False):
+        """Release jobs orphaned by dead workers and purge old finished rows."""
+        now = datetime.utcnow()
+        orphaned = Job.locked_at < now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+        if startup:
+            # Rows still locked under our id were left by a previous run of this worker
+            orphaned = or_(orphaned, Job.locked_by == self.id)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.status == "running", orphaned, Job.id.not_in(self._running_ids))
+                    .values(status="pending", locked_by=None, locked_at=None, run_after=now)
+                )
+                await db.execute(
+                    delete(Job).where(
+                        Job.status.in_(("done", "failed")),
+                        Job.finished_at < now - timedelta(seconds=settings.JOB_RETENTION_SECONDS),
+                    )
+                )
+                await db.commit()
+        except Exception:
+            logger.exception("Job maintenance failed")
+
+    async def stats(self, db: AsyncSession) -> dict:
+        result = await db.execute(
+            select(Job.type, Job.status, func.count(), func.min(Job.run_after))
+            .where(Job.status.in_(("pending", "running")))
+            .group_by(Job.type, Job.status)
+        )
+        rows = result.all()
+        now = datetime.utcnow()
+        out = {}
+        for name in sorted(set(registry) | {row[0] for row in rows} | set(self.enqueued)):
+            done = self.succeeded[name] + self.retried[name] + self.failed[name]
+            out[name] = {
+                "pending": 0,
+                "running": 0,
+                "oldest_pending_seconds": 0.0,
+                "in_process": self._running[name],
+                "concurrency": registry[name].concurrency if name in registry else 0,
+                "enqueued": self.enqueued[name],
+                "succeeded": self.succeeded[name],
+                "retried": self.retried[name],
+                "failed": self.failed[name],
+                "avg_wait_ms": round(self.wait_seconds[name] / done * 1000, 2) if done else 0.0,
+                "avg_run_ms": round(self.run_seconds[name] / done * 1000, 2) if done else 0.0,
+            }
+        for name, status, count, oldest in rows:
+            out[name][status] = count
+            if status == "pending" and oldest is not None:
+                out[name]["oldest_pending_seconds"] = round(max(0.0, (now - oldest).total_seconds()), 2)
+        return out
+
+
+worker = Worker()
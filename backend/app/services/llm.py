@@ -1,26 +1,93 @@
 """
 LLM service - swap provider via LLM_PROVIDER env var.
 Supports: mock | ollama | openai
+
+Provider clients are created once (app lifespan, or lazily outside the app)
+and reused, so calls share pooled keep-alive connections. Completions from
+real providers go through the content-addressed cache in llm_cache, and
+calls that miss it wait for a slot from llm_scheduler.
 """
+import importlib.util
+import json
+import time
+from typing import AsyncIterator, Optional
+
 import httpx
 from app.core.config import settings
+from app.services.llm_cache import cache, cache_key
+from app.services.llm_scheduler import LLMQueueTimeout, scheduler  # noqa: F401 - LLMQueueTimeout is re-exported
 
+OLLAMA_MODEL = "llama3.2"
 
-async def _ollama_complete(prompt: str) -> str:
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(
-            f"{settings.OLLAMA_BASE_URL}/api/generate",
-            json={"model": "llama3.2", "prompt": prompt, "stream": False},
+_http: Optional[httpx.AsyncClient] = None
+_openai = None
+
+
+def _client_options() -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "timeout": httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS),
+        # HTTP/2 needs the optional h2 package (pip install httpx[http2])
+        "http2": settings.LLM_HTTP2 and importlib.util.find_spec("h2") is not None,
+    }
+
+
+def http_client() -> httpx.AsyncClient:
+    """Shared client for HTTP providers (Ollama)."""
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.AsyncClient(**_client_options())
+    return _http
+
+
+def openai_client():
+    global _openai
+    if _openai is None:
+        from openai import AsyncOpenAI
+
+        _openai = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=httpx.AsyncClient(**_client_options()),
         )
-        resp.raise_for_status()
-        return resp.json()["response"]
+    return _openai
 
 
-async def _openai_complete(prompt: str) -> str:
-    from openai import AsyncOpenAI
+async def startup():
+    """Create provider clients up front (called from the app lifespan)."""
+    if settings.LLM_PROVIDER == "ollama":
+        http_client()
+    elif settings.LLM_PROVIDER == "openai":
+        openai_client()
+    if settings.LLM_PROVIDER in ("ollama", "openai"):
+        scheduler.limiter(settings.LLM_PROVIDER)  # rejects a bad slot configuration now, not on first call
+
+
+async def shutdown():
+    global _http, _openai
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+    if _openai is not None:
+        await _openai.close()
+        _openai = None
+    cache.disk.close()
 
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-    response = await client.chat.completions.create(
+
+async def _ollama_complete(prompt: str) -> str:
+    resp = await http_client().post(
+        f"{settings.OLLAMA_BASE_URL}/api/generate",
+        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False},
+    )
+    resp.raise_for_status()
+    return resp.json()["response"]
+
+
+async def _openai_complete(prompt: str) -> str:
+    response = await openai_client().chat.completions.create(
         model=settings.OPENAI_MODEL,
         messages=[{"role": "user", "content": prompt}],
         max_tokens=400,
@@ -28,32 +95,116 @@ async def _openai_complete(prompt: str) -> str:
     return response.choices[0].message.content
 
 
+async def _ollama_stream(prompt: str) -> AsyncIterator[str]:
+    async with http_client().stream(
+        "POST",
+        f"{settings.OLLAMA_BASE_URL}/api/generate",
+        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": True},
+    ) as resp:
+        resp.raise_for_status()
+        # One JSON object per line: {"response": "<token>", "done": false}
+        async for line in resp.aiter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
+
+
+async def _openai_stream(prompt: str) -> AsyncIterator[str]:
+    stream = await openai_client().chat.completions.create(
+        model=settings.OPENAI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=400,
+        stream=True,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def _mock_complete(prompt: str) -> str:
+    if "summary" in prompt.lower():
+        return "This is an engaging book that offers valuable insights and a compelling narrative. Readers will find it both informative and enjoyable."
+    elif "sentiment" in prompt.lower():
+        return "positive"
+    elif "recommend" in prompt.lower():
+        return "Based on reading history and preferences, these titles offer similar themes, writing styles, and subject matter."
+    return "Mock LLM response."
+
+
+async def _scheduled(complete, prompt: str) -> str:
+    async with scheduler.slot(settings.LLM_PROVIDER):
+        return await complete(prompt)
+
+
+async def _cached(model: str, prompt: str, complete) -> str:
+    if not settings.LLM_CACHE_ENABLED:
+        return await _scheduled(complete, prompt)
+    key = cache_key(settings.LLM_PROVIDER, model, prompt)
+    return await cache.get_or_call(key, lambda: _scheduled(complete, prompt))
+
+
 async def llm_complete(prompt: str) -> str:
     if settings.LLM_PROVIDER == "ollama":
-        return await _ollama_complete(prompt)
+        return await _cached(OLLAMA_MODEL, prompt, _ollama_complete)
     elif settings.LLM_PROVIDER == "openai":
-        return await _openai_complete(prompt)
+        return await _cached(settings.OPENAI_MODEL, prompt, _openai_complete)
     else:
-        # Mock provider
-        if "summary" in prompt.lower():
-            return "This is an engaging book that offers valuable insights and a compelling narrative. Readers will find it both informative and enjoyable."
-        elif "sentiment" in prompt.lower():
-            return "positive"
-        elif "recommend" in prompt.lower():
-            return "Based on reading history and preferences, these titles offer similar themes, writing styles, and subject matter."
-        return "Mock LLM response."
+        return _mock_complete(prompt)
 
 
-async def generate_book_summary(title: str, author: str, description: str) -> str:
-    if not description:
-        return f"'{title}' by {author} is a notable work in its genre."
-    prompt = f"""Write a concise 2-3 sentence summary of this book:
+async def llm_stream(prompt: str) -> AsyncIterator[str]:
+    """Yield the completion as it is generated. A cached completion arrives as one chunk
+    and a finished stream is added to the cache."""
+    if settings.LLM_PROVIDER == "ollama":
+        model, stream = OLLAMA_MODEL, _ollama_stream
+    elif settings.LLM_PROVIDER == "openai":
+        model, stream = settings.OPENAI_MODEL, _openai_stream
+    else:
+        for word in _mock_complete(prompt).split(" "):
+            yield word + " "
+        return
+
+    key = cache_key(settings.LLM_PROVIDER, model, prompt)
+    if settings.LLM_CACHE_ENABLED:
+        cached = await cache.lookup(key)
+        if cached is not None:
+            yield cached
+            return
+    parts = []
+    async with scheduler.slot(settings.LLM_PROVIDER):
+        started = time.perf_counter()
+        async for token in stream(prompt):
+            parts.append(token)
+            yield token
+    if settings.LLM_CACHE_ENABLED:
+        await cache.store(key, "".join(parts), time.perf_counter() - started)
+
+
+def _summary_prompt(title: str, author: str, description: str) -> str:
+    return f"""Write a concise 2-3 sentence summary of this book:
 Title: {title}
 Author: {author}
 Description: {description}
 
 Summary:"""
-    return await llm_complete(prompt)
+
+
+async def generate_book_summary(title: str, author: str, description: str) -> str:
+    if not description:
+        return f"'{title}' by {author} is a notable work in its genre."
+    return await llm_complete(_summary_prompt(title, author, description))
+
+
+async def stream_book_summary(title: str, author: str, description: str) -> AsyncIterator[str]:
+    if not description:
+        yield f"'{title}' by {author} is a notable work in its genre."
+        return
+    async for token in llm_stream(_summary_prompt(title, author, description)):
+        yield token
 
 
 async def analyze_review_sentiment(review_text: str) -> str:
@@ -73,6 +224,32 @@ Sentiment:"""
     return "neutral"
 
 
+SENTIMENTS = ("positive", "negative", "neutral")
+
+
+async def analyze_review_sentiments(review_texts: list[str]) -> list[Optional[str]]:
+    """Classify several reviews in one call. Items the model didn't answer cleanly are None."""
+    if settings.LLM_PROVIDER not in ("ollama", "openai"):
+        return ["positive"] * len(review_texts)
+    numbered = "\n".join(f"{i + 1}. {text[:1000]!r}" for i, text in enumerate(review_texts))
+    prompt = f"""Analyze the sentiment of each numbered book review below.
+Respond with only a JSON array of {len(review_texts)} strings, in the same order, each one of: "positive", "negative", "neutral".
+
+Reviews:
+{numbered}
+
+JSON:"""
+    result = await llm_complete(prompt)
+    try:
+        labels = json.loads(result[result.index("[") : result.rindex("]") + 1])
+    except ValueError:
+        return [None] * len(review_texts)
+    if not isinstance(labels, list) or len(labels) != len(review_texts):
+        return [None] * len(review_texts)
+    labels = [label.strip().lower() if isinstance(label, str) else None for label in labels]
+    return [label if label in SENTIMENTS else None for label in labels]
+
+
 async def generate_review_consensus(reviews: list[dict]) -> str:
     if not reviews:
         return "No reviews yet."
@@ -0,0 +1,205 @@
+"""
+Content-addressed cache for LLM completions.
+Keys are a SHA-256 of (provider, model, prompt). A small in-memory LRU sits in
+front of a SQLite file under INDEX_DIR, so identical prompts survive restarts
+and are shared by every worker on the host. Entries expire after a TTL and the
+least recently used are evicted once the store exceeds its entry budget.
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services import llm_scheduler
+from app.services.cache import TTLCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    latency REAL NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_llm_responses_accessed_at ON llm_responses (accessed_at);
+"""
+
+
+def cache_key(provider: str, model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{provider}\0{model}\0{prompt}".encode()).hexdigest()
+
+
+class DiskStore:
+    """SQLite tier; every method is blocking and runs on a worker thread."""
+
+    def __init__(self, path: Path, ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[tuple]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, latency FROM llm_responses WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            return row
+
+    def set(self, key: str, response: str, latency: float):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, latency, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, latency, now, now),
+            )
+            self._writes += 1
+            # Amortize eviction: only check the budget every few hundred writes
+            if self._writes % 256 == 1:
+                self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        removed = conn.execute("DELETE FROM llm_responses WHERE created_at <= ?", (now - self.ttl,)).rowcount
+        (count,) = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()
+        if count > self.max_entries:
+            # Trim to 90% so we don't evict on every subsequent write
+            excess = count - int(self.max_entries * 0.9)
+            removed += conn.execute(
+                "DELETE FROM llm_responses WHERE key IN "
+                "(SELECT key FROM llm_responses ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self.evictions += removed
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ResponseCache:
+    def __init__(self, memory_size: int, disk: DiskStore):
+        self.memory = TTLCache(maxsize=memory_size, ttl=disk.ttl)
+        self.disk = disk
+        self._inflight: Dict[str, Tuple[asyncio.Future, llm_scheduler.Ticket]] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+        self.call_seconds = 0.0
+
+    async def lookup(self, key: str) -> Optional[str]:
+        """Cached response for ``key`` (memory, then disk), counted as a hit; None otherwise."""
+        entry = self.memory.get(key)
+        if entry is None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.disk_hits += 1
+                self.memory.set(key, entry)
+        if entry is None:
+            return None
+        self.hits += 1
+        self.saved_seconds += entry[1]
+        return entry[0]
+
+    async def store(self, key: str, response: str, latency: float):
+        self.memory.set(key, (response, latency))
+        await asyncio.to_thread(self.disk.set, key, response, latency)
+
+    async def get_or_call(self, key: str, call: Callable[[], Awaitable[str]]) -> str:
+        """Return a cached response for ``key`` or run ``call`` once and store it.
+
+        Concurrent requests for the same key wait on the first caller; an interactive
+        caller promotes a background call it joins to the interactive lane.
+        """
+        cached = await self.lookup(key)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            pending, ticket = inflight
+            self.coalesced += 1
+            if llm_scheduler.current_lane() == "interactive":
+                ticket.promote()
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The first caller was cancelled; make the call ourselves
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        try:
+            started = time.perf_counter()
+            with llm_scheduler.ticket() as ticket:
+                self._inflight[key] = (future, ticket)
+                response = await call()
+            latency = time.perf_counter() - started
+            self.call_seconds += latency
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(response)
+        await self.store(key, response, latency)
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.hits - self.disk_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "avg_call_ms": round(self.call_seconds / self.misses * 1000, 2) if self.misses else 0.0,
+            "memory": self.memory.stats(),
+            "disk_evictions": self.disk.evictions,
+        }
+
+
+cache = ResponseCache(
+    memory_size=settings.LLM_CACHE_MEMORY_SIZE,
+    disk=DiskStore(
+        path=Path(settings.INDEX_DIR) / "llm_cache.sqlite3",
+        ttl=settings.LLM_CACHE_TTL_SECONDS,
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ),
+)
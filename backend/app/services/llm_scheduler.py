@@ -0,0 +1,235 @@
+"""
+Admission control for outbound LLM calls.
+Each provider gets a concurrency limit and an optional token-bucket rate limit.
+Calls wait in one of two lanes: interactive (request handlers, the default)
+is always admitted first, and background work (summaries, sentiment,
+consensus) can never take the last LLM_INTERACTIVE_RESERVED_SLOTS slots, so
+a bulk import can't starve a user waiting on a response. A call that waits
+longer than its lane's queue timeout fails with LLMQueueTimeout.
+
+A call made on behalf of several callers (llm_cache coalescing) carries a
+Ticket; an interactive caller joining a background call promotes it to the
+interactive lane and its queue timeout, so the user doesn't wait behind jobs.
+"""
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+LANES = ("interactive", "background")
+
+_lane: contextvars.ContextVar[str] = contextvars.ContextVar("llm_lane", default="interactive")
+_ticket: contextvars.ContextVar[Optional["Ticket"]] = contextvars.ContextVar("llm_ticket", default=None)
+
+
+class LLMQueueTimeout(Exception):
+    pass
+
+
+def current_lane() -> str:
+    return _lane.get()
+
+
+def queue_timeout(lane: str) -> float:
+    if lane == "background":
+        return settings.LLM_BACKGROUND_QUEUE_TIMEOUT_SECONDS
+    return settings.LLM_INTERACTIVE_QUEUE_TIMEOUT_SECONDS
+
+
+@contextmanager
+def background():
+    """Run LLM calls made inside this block (and tasks it spawns) in the background lane."""
+    token = _lane.set("background")
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class Ticket:
+    """The lane of one call, which callers waiting on its result can promote."""
+
+    def __init__(self, lane: str):
+        self.lane = lane
+        self._queued: Optional[Tuple["ProviderLimiter", asyncio.Future]] = None
+
+    def promote(self):
+        """Move the call to the interactive lane if it hasn't been admitted yet."""
+        if self.lane == "interactive":
+            return
+        if self._queued is not None:
+            limiter, future = self._queued
+            if future.done():
+                return  # already running (or timed out) in the background lane
+            limiter._promote(future)
+        self.lane = "interactive"
+
+
+@contextmanager
+def ticket():
+    """Calls made inside this block share one Ticket, in the current lane."""
+    token = _ticket.set(Ticket(_lane.get()))
+    try:
+        yield _ticket.get()
+    finally:
+        _ticket.reset(token)
+
+
+class ProviderLimiter:
+    def __init__(self, name: str, concurrency: int, rate: float, burst: int, reserved: int):
+        if reserved and concurrency <= reserved:
+            raise ValueError(
+                f"LLM_CONCURRENCY for {name} ({concurrency}) must exceed "
+                f"LLM_INTERACTIVE_RESERVED_SLOTS ({reserved})"
+            )
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.background_limit = self.concurrency - reserved
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._refill_timer: Optional[asyncio.TimerHandle] = None
+        self._queues: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self.in_flight = {lane: 0 for lane in LANES}
+        self.admitted = {lane: 0 for lane in LANES}
+        self.timeouts = {lane: 0 for lane in LANES}
+        self.wait_seconds = {lane: 0.0 for lane in LANES}
+        self.max_wait_seconds = {lane: 0.0 for lane in LANES}
+
+    def _can_start(self, lane: str) -> bool:
+        if sum(self.in_flight.values()) >= self.concurrency:
+            return False
+        return lane != "background" or self.in_flight["background"] < self.background_limit
+
+    def _take_token(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        if self._refill_timer is None:
+            delay = (1 - self._tokens) / self.rate
+            self._refill_timer = asyncio.get_running_loop().call_later(delay, self._on_refill)
+        return False
+
+    def _on_refill(self):
+        self._refill_timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        for lane in LANES:  # interactive first
+            queue = self._queues[lane]
+            while queue:
+                if queue[0].done():  # timed out or cancelled while queued
+                    queue.popleft()
+                    continue
+                if not self._can_start(lane):
+                    break
+                if not self._take_token():
+                    return
+                self.in_flight[lane] += 1
+                queue.popleft().set_result(None)
+
+    async def acquire(self, lane: str, timeout: float, ticket: Optional[Ticket] = None) -> str:
+        """Wait for a slot; returns the lane it was admitted in, to pass to :meth:`release`."""
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._queues[lane].append(future)
+        if ticket is not None:
+            ticket._queued = (self, future)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if ticket is not None and ticket.lane != lane:  # promoted, then timed out as interactive
+                lane, timeout = ticket.lane, queue_timeout(ticket.lane)
+            # _dispatch may have admitted us in the same tick the timeout fired; give the slot back
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(lane)
+            self.timeouts[lane] += 1
+            raise LLMQueueTimeout(f"{self.name} {lane} queue wait exceeded {timeout}s") from None
+        except asyncio.CancelledError:
+            lane = ticket.lane if ticket is not None else lane
+            if future.done() and not future.cancelled():
+                self.release(lane)
+            raise
+        lane = ticket.lane if ticket is not None else lane
+        waited = time.perf_counter() - started
+        self.admitted[lane] += 1
+        self.wait_seconds[lane] += waited
+        self.max_wait_seconds[lane] = max(self.max_wait_seconds[lane], waited)
+        return lane
+
+    def _promote(self, future: asyncio.Future):
+        self._queues["background"].remove(future)
+        self._queues["interactive"].append(future)
+        # From now on the call waits no longer than an interactive one would
+        asyncio.get_running_loop().call_later(
+            settings.LLM_INTERACTIVE_QUEUE_TIMEOUT_SECONDS,
+            lambda: future.done() or future.set_exception(asyncio.TimeoutError()),
+        )
+        self._dispatch()
+
+    def release(self, lane: str):
+        self.in_flight[lane] -= 1
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "rate_per_second": self.rate,
+            **{
+                lane: {
+                    "queued": sum(not f.done() for f in self._queues[lane]),
+                    "in_flight": self.in_flight[lane],
+                    "admitted": self.admitted[lane],
+                    "timeouts": self.timeouts[lane],
+                    "avg_wait_ms": round(self.wait_seconds[lane] / self.admitted[lane] * 1000, 2)
+                    if self.admitted[lane] else 0.0,
+                    "max_wait_ms": round(self.max_wait_seconds[lane] * 1000, 2),
+                }
+                for lane in LANES
+            },
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self._limiters: Dict[str, ProviderLimiter] = {}
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        if provider not in self._limiters:
+            self._limiters[provider] = ProviderLimiter(
+                provider,
+                concurrency=settings.LLM_CONCURRENCY.get(provider, 8),
+                rate=settings.LLM_RATE_LIMITS.get(provider, 0.0),
+                burst=settings.LLM_RATE_BURST,
+                reserved=settings.LLM_INTERACTIVE_RESERVED_SLOTS,
+            )
+        return self._limiters[provider]
+
+    @asynccontextmanager
+    async def slot(self, provider: str):
+        """Hold one of ``provider``'s call slots, waiting in the current lane (or the ticket's)."""
+        ticket = _ticket.get()
+        lane = ticket.lane if ticket is not None else _lane.get()
+        limiter = self.limiter(provider)
+        lane = await limiter.acquire(lane, queue_timeout(lane), ticket)
+        try:
+            yield
+        finally:
+            limiter.release(lane)
+
+    def stats(self) -> dict:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+scheduler = Scheduler()
@@ -0,0 +1,135 @@
+"""
+Offline top-N recommendations for every user.
+The catalog and collaborative indexes are built once in the parent process
+and inherited by forked workers, which score users in chunks with the same
+vectorized scorer the API uses. Results land in precomputed_recommendations,
+which GET /recommendations serves while they are fresh.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.book import Book
+from app.models.recommendation import PrecomputedDiscard, PrecomputedRecommendation
+from app.models.review import Borrow, UserPreference
+from app.models.user import User
+from app.services import catalog, collaborative
+from app.services.recommendations import (
+    hybrid_reason,
+    parse_preferences,
+    prepare_scoring,
+    score_catalog,
+)
+
+# (user_id, borrowed_ids, favorite_genres, favorite_authors)
+UserInput = Tuple[int, set, str, str]
+
+
+def _score_users(chunk: List[UserInput], limit: int) -> List[Tuple[int, list]]:
+    """Worker entry point: rank a chunk of users against the inherited indexes."""
+    out = []
+    for user_id, borrowed_ids, genres, authors in chunk:
+        fav_genres, fav_authors = parse_preferences(genres, authors)
+        inputs = prepare_scoring(user_id, borrowed_ids, fav_genres, fav_authors)
+        out.append((user_id, score_catalog(inputs, limit)))
+    return out
+
+
+async def _load_inputs(db: AsyncSession) -> List[UserInput]:
+    users = (await db.execute(select(User.id).where(User.is_active == True))).scalars().all()  # noqa: E712
+
+    borrowed = defaultdict(set)
+    result = await db.stream(
+        select(Borrow.user_id, Borrow.book_id).execution_options(yield_per=settings.DB_STREAM_BATCH_SIZE)
+    )
+    async for user_id, book_id in result:
+        borrowed[user_id].add(book_id)
+
+    prefs = {
+        user_id: (genres, authors)
+        for user_id, genres, authors in (
+            await db.execute(
+                select(UserPreference.user_id, UserPreference.favorite_genres, UserPreference.favorite_authors)
+            )
+        ).all()
+    }
+    return [(u, borrowed.get(u, set()), *prefs.get(u, (None, None))) for u in users]
+
+
+async def _write_chunk(db: AsyncSession, ranked: List[Tuple[int, list]], computed_at: datetime) -> int:
+    """Store one chunk's results, skipping users whose history changed after ``computed_at``
+    (the rows were scored from inputs read before that). Returns the number of users written."""
+    discarded = set(
+        (
+            await db.execute(
+                select(PrecomputedDiscard.user_id).where(
+                    PrecomputedDiscard.user_id.in_([u for u, _ in ranked]),
+                    PrecomputedDiscard.discarded_at >= computed_at,
+                )
+            )
+        ).scalars().all()
+    )
+    ranked = [(user_id, rows) for user_id, rows in ranked if user_id not in discarded]
+    if not ranked:
+        return 0
+
+    book_ids = {book_id for _, rows in ranked for book_id, _, _ in rows}
+    meta = {}
+    if book_ids:
+        result = await db.execute(
+            select(Book.id, Book.genre, Book.author, Book.avg_rating).where(Book.id.in_(book_ids))
+        )
+        meta = {row.id: row for row in result.all()}
+
+    values = [
+        {
+            "user_id": user_id,
+            "book_id": book_id,
+            "rank": rank,
+            "score": score,
+            "reason": hybrid_reason(meta[book_id], flags)[:500],
+            "computed_at": computed_at,
+        }
+        for user_id, rows in ranked
+        for rank, (book_id, score, flags) in enumerate(rows)
+        if book_id in meta
+    ]
+    await db.execute(
+        delete(PrecomputedRecommendation).where(PrecomputedRecommendation.user_id.in_([u for u, _ in ranked]))
+    )
+    if values:
+        await db.execute(insert(PrecomputedRecommendation), values)
+    await db.commit()
+    return len(ranked)
+
+
+async def run(db: AsyncSession, limit: int, workers: int = 0, chunk_size: int = 500) -> dict:
+    started = time.monotonic()
+    catalog.index.mark_stale()
+    collaborative.index.mark_stale()
+    await catalog.index.ensure_built(db)
+    await collaborative.index.ensure_built(db)
+    catalog.index.snapshot()  # flush pending rows before forking
+
+    computed_at = datetime.utcnow()  # before the inputs are read: later changes make rows stale
+    inputs = await _load_inputs(db)
+    chunks = [inputs[i:i + chunk_size] for i in range(0, len(inputs), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    loop = asyncio.get_running_loop()
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        futures = [loop.run_in_executor(pool, _score_users, chunk, limit) for chunk in chunks]
+        for future in asyncio.as_completed(futures):
+            written += await _write_chunk(db, await future, computed_at)
+
+    return {"users": written, "workers": workers, "seconds": round(time.monotonic() - started, 2)}
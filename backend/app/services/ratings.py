@@ -0,0 +1,89 @@
+"""
+Running rating aggregates on books.
+Each review insert/delete adjusts rating_sum, rating_count and the 1-5
+histogram with a single UPDATE in the caller's transaction, and avg_rating is
+derived from the new totals in the same statement, so no AVG scan is needed.
+repair() rebuilds every book's aggregates from the reviews table; backfill()
+runs it at startup when a database upgraded in place still has zeroed totals.
+"""
+from typing import Optional
+
+from sqlalchemy import case, func, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.book import Book
+from app.models.review import Review
+
+STARS = range(1, 6)
+
+
+def _avg(total, count):
+    # 1.0 literal: numeric division on Postgres (so round(x, 2) applies), real on SQLite
+    return case((count > 0, func.round(total * literal_column("1.0") / count, 2)), else_=None)
+
+
+async def apply(db: AsyncSession, book_id: int, rating: int, delta: int) -> Optional[float]:
+    """Add (``delta=1``) or remove (``delta=-1``) one review's rating; returns the new average."""
+    total = Book.rating_sum + rating * delta
+    count = Book.rating_count + delta
+    bucket = getattr(Book, f"rating_{rating}")
+    result = await db.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values({
+            Book.rating_sum: total,
+            Book.rating_count: count,
+            bucket: bucket + delta,
+            Book.avg_rating: _avg(total, count),
+        })
+        .returning(Book.avg_rating)
+        .execution_options(synchronize_session=False)
+    )
+    avg = result.scalar()
+    return float(avg) if avg is not None else None
+
+
+async def repair(db: AsyncSession) -> int:
+    """Recompute all aggregates from reviews in bulk. Returns the number of books with reviews."""
+    await db.execute(
+        update(Book).values(
+            rating_sum=0, rating_count=0, avg_rating=None, **{f"rating_{s}": 0 for s in STARS}
+        )
+    )
+    result = await db.execute(
+        select(
+            Review.book_id,
+            func.sum(Review.rating),
+            func.count(),
+            *(func.sum(case((Review.rating == s, 1), else_=0)) for s in STARS),
+        )
+        .group_by(Review.book_id)
+    )
+    repaired = 0
+    for rows in result.partitions(settings.DB_STREAM_BATCH_SIZE):
+        values = [
+            {
+                "id": book_id,
+                "rating_sum": total,
+                "rating_count": count,
+                "avg_rating": round(total / count, 2),
+                **{f"rating_{s}": n for s, n in zip(STARS, histogram)},
+            }
+            for book_id, total, count, *histogram in rows
+        ]
+        await db.execute(update(Book), values)
+        repaired += len(values)
+    await db.commit()
+    return repaired
+
+
+async def backfill(db: AsyncSession) -> Optional[int]:
+    """Run :func:`repair` if some book has an average but no counted ratings, as after the
+    aggregate columns are added to an existing database. Returns the repair count, if run."""
+    stale = await db.scalar(
+        select(Book.id).where(Book.avg_rating.is_not(None), Book.rating_count == 0).limit(1)
+    )
+    if stale is None:
+        return None
+    return await repair(db)
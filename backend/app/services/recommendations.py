@@ -1,126 +1,394 @@
 """
 Recommendation engine.
-hybrid: TF-IDF content similarity + collaborative filtering + user preferences
+hybrid: TF-IDF content similarity + item-item collaborative filtering + user preferences
 llm: Uses LLM to rank and explain recommendations
+llm_rerank: hybrid scorer shortlists top-K, LLM reorders them (cached, time-boxed)
 """
-from typing import List, Tuple
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import case, delete, func, or_, select
 
+from app.db import dialect_insert, load_many
 from app.models.book import Book
+from app.models.recommendation import PrecomputedDiscard, PrecomputedRecommendation
 from app.models.review import Borrow, UserPreference
 from app.core.config import settings
+from app.services import catalog, collaborative, compute
+from app.services.cache import TTLCache
+from app.services.catalog import normalize_key
+
+
+ENGINES = ("hybrid", "llm", "llm_rerank")
+
+# (user_id, engine) -> (limit, [(book_id, score, reason), ...])
+_result_cache = TTLCache(
+    maxsize=settings.RECOMMENDATION_CACHE_SIZE,
+    ttl=settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+)
+
+# Bumped by every invalidation; a result computed across one is not cached
+_generation = 0
+
+# sha256(rerank prompt) -> candidate indices in LLM order
+_rerank_cache = TTLCache(
+    maxsize=settings.RERANK_CACHE_SIZE,
+    ttl=settings.RERANK_CACHE_TTL_SECONDS,
+)
+# sha256(rerank prompt) -> the LLM call in flight for it; repeat requests wait on the same call
+_rerank_tasks: Dict[str, asyncio.Task] = {}
 
 
 async def get_recommendations(user_id: int, db: AsyncSession, limit: int = 10) -> List[Tuple[Book, float, str]]:
-    if settings.RECOMMENDATION_ENGINE == "llm":
-        return await _llm_recommendations(user_id, db, limit)
-    return await _hybrid_recommendations(user_id, db, limit)
+    engine = settings.RECOMMENDATION_ENGINE if settings.RECOMMENDATION_ENGINE in ENGINES else "hybrid"
+    key = (user_id, engine)
+
+    cached = _result_cache.get(key)
+    if cached is not None and cached[0] >= limit:
+        return await _load_ranked(db, cached[1][:limit])
+    generation = _generation
+
+    if engine == "llm":
+        results = await _llm_recommendations(user_id, db, limit)
+    elif engine == "llm_rerank":
+        results, reranked = await _rerank_recommendations(user_id, db, limit)
+        if not reranked:
+            # Hybrid fallback: don't pin it in the cache, the LLM order may land shortly
+            return results
+    else:
+        results = await _precomputed_recommendations(user_id, db, limit)
+        if results is None:
+            results = await _hybrid_recommendations(user_id, db, limit)
+
+    if generation == _generation:  # else computed from data an invalidation has since replaced
+        _result_cache.set(key, (limit, [(book.id, score, reason) for book, score, reason in results]))
+    return results
+
+
+def invalidate_user(user_id: int):
+    """Drop cached results for one user (their borrows or preferences changed)."""
+    global _generation
+    _generation += 1
+    for engine in ENGINES:
+        _result_cache.pop((user_id, engine))
+
+
+def invalidate_all():
+    """Drop every cached result (a book or rating changed)."""
+    global _generation
+    _generation += 1
+    _result_cache.clear()
+
+
+async def discard_precomputed(db: AsyncSession, user_id: int):
+    """Delete a user's offline results; call inside the transaction that changes their history.
+    Also records the time, so a precompute run that read the old history can't bring them back."""
+    await db.execute(delete(PrecomputedRecommendation).where(PrecomputedRecommendation.user_id == user_id))
+    now = datetime.utcnow()
+    await db.execute(
+        dialect_insert(db)(PrecomputedDiscard)
+        .values(user_id=user_id, discarded_at=now)
+        .on_conflict_do_update(index_elements=["user_id"], set_={"discarded_at": now})
+    )
+
+
+def cache_stats() -> dict:
+    return {**_result_cache.stats(), "rerank": _rerank_cache.stats()}
+
+
+async def _load_ranked(db: AsyncSession, ranked: List[Tuple[int, float, str]]) -> List[Tuple[Book, float, str]]:
+    if not ranked:
+        return []
+    books = await load_many(db, Book, (book_id for book_id, _, _ in ranked))
+    return [(books[book_id], score, reason) for book_id, score, reason in ranked if book_id in books]
+
+
+async def _precomputed_recommendations(user_id: int, db: AsyncSession, limit: int) -> Optional[List[Tuple[Book, float, str]]]:
+    """Rows written by ``python -m app.cli precompute-recommendations``, or None when missing/stale.
+    Rows computed before the user's history last changed, or for books they have borrowed since,
+    are skipped."""
+    fresh_after = datetime.utcnow() - timedelta(seconds=settings.PRECOMPUTED_MAX_AGE_SECONDS)
+    result = await db.execute(
+        select(PrecomputedRecommendation, Book)
+        .join(Book, Book.id == PrecomputedRecommendation.book_id)
+        .outerjoin(PrecomputedDiscard, PrecomputedDiscard.user_id == PrecomputedRecommendation.user_id)
+        .where(
+            PrecomputedRecommendation.user_id == user_id,
+            PrecomputedRecommendation.computed_at >= fresh_after,
+            or_(
+                PrecomputedDiscard.discarded_at.is_(None),
+                PrecomputedRecommendation.computed_at > PrecomputedDiscard.discarded_at,
+            ),
+            Book.id.not_in(select(Borrow.book_id).where(Borrow.user_id == user_id)),
+        )
+        .order_by(PrecomputedRecommendation.rank)
+        .limit(limit)
+    )
+    rows = result.all()
+    if len(rows) < limit:
+        return None
+    return [(book, rec.score, rec.reason) for rec, book in rows]
+
+
+async def _load_preferences(db: AsyncSession, user_id: int) -> Tuple[Set[str], Set[str]]:
+    result = await db.execute(
+        select(UserPreference.favorite_genres, UserPreference.favorite_authors)
+        .where(UserPreference.user_id == user_id)
+    )
+    row = result.one_or_none()
+    return parse_preferences(*row) if row else (set(), set())
+
+
+def parse_preferences(favorite_genres: Optional[str], favorite_authors: Optional[str]) -> Tuple[Set[str], Set[str]]:
+    fav_genres = {normalize_key(g) for g in (favorite_genres or "").split(",")}
+    fav_authors = {normalize_key(a) for a in (favorite_authors or "").split(",")}
+    return fav_genres - {""}, fav_authors - {""}
+
+
+LLM_CANDIDATES = 20
+
+# Hybrid weights
+W_GENRE = 0.4
+W_AUTHOR = 0.35
+W_RATING = 0.2
+W_TFIDF = 0.15
+W_HISTORY_GENRE = 0.1
+W_ITEM_CF = 0.25
+
+
+class ScoringInput(NamedTuple):
+    """Plain arrays ``score_catalog`` needs; safe to pickle to a worker process."""
+
+    ids: np.ndarray
+    alive: np.ndarray
+    genres: np.ndarray
+    authors: np.ndarray
+    ratings: np.ndarray
+    has_text: np.ndarray
+    sims: Optional[np.ndarray]
+    borrowed_rows: np.ndarray
+    fav_genre_codes: np.ndarray
+    fav_author_codes: np.ndarray
+    cf_rows: np.ndarray
+    cf_values: np.ndarray
+
+
+class CatalogColumns(NamedTuple):
+    """The catalog arrays of a ``ScoringInput``, shared by every user; process-pool
+    workers keep one copy per catalog version (``compute.ComputePool.run_shared``)."""
+
+    ids: np.ndarray
+    alive: np.ndarray
+    genres: np.ndarray
+    authors: np.ndarray
+    ratings: np.ndarray
+    has_text: np.ndarray
+    matrix: object  # scipy.sparse.csr_matrix
+
+
+def prepare_scoring(user_id: int, borrowed_ids: Set[int], fav_genres: Set[str], fav_authors: Set[str]) -> ScoringInput:
+    """Read the catalog and co-borrow indexes for one user (touches in-process state)."""
+    return _scoring_input(catalog.index.snapshot(borrowed_ids), user_id, borrowed_ids, fav_genres, fav_authors)
+
+
+def prepare_user_scoring(
+    user_id: int, borrowed_ids: Set[int], fav_genres: Set[str], fav_authors: Set[str]
+) -> Tuple[int, CatalogColumns, ScoringInput, Optional[np.ndarray], Tuple[np.ndarray, np.ndarray]]:
+    """Like ``prepare_scoring``, but the catalog arrays, the history profile and the rating
+    updates since the catalog version come back separately, as
+    ``(version, columns, inputs, profile, rating_changes)``, for ``score_user``."""
+    snapshot = catalog.index.snapshot(borrowed_ids, similarities=False)
+    columns = CatalogColumns(*(getattr(snapshot, field) for field in CatalogColumns._fields))
+    inputs = _scoring_input(snapshot, user_id, borrowed_ids, fav_genres, fav_authors)
+    empty = np.empty(0)
+    inputs = inputs._replace(ids=empty, alive=empty, genres=empty, authors=empty, ratings=empty, has_text=empty)
+    return snapshot.version, columns, inputs, snapshot.profile, snapshot.rating_changes
+
+
+def score_user(
+    columns: CatalogColumns,
+    inputs: ScoringInput,
+    profile: Optional[np.ndarray],
+    rating_changes: Tuple[np.ndarray, np.ndarray],
+    limit: int,
+) -> List[Tuple[int, float, dict]]:
+    """``score_catalog`` for inputs from ``prepare_user_scoring``; TF-IDF similarity is
+    computed here, next to the matrix, rather than shipped per request."""
+    sims = columns.matrix @ profile if profile is not None else None
+    rows, values = rating_changes
+    ratings = columns.ratings
+    if len(rows):
+        ratings = ratings.copy()
+        ratings[rows] = values
+    return score_catalog(
+        inputs._replace(
+            ids=columns.ids, alive=columns.alive, genres=columns.genres, authors=columns.authors,
+            ratings=ratings, has_text=columns.has_text, sims=sims,
+        ),
+        limit,
+    )
+
+
+def _scoring_input(snapshot, user_id: int, borrowed_ids: Set[int], fav_genres: Set[str], fav_authors: Set[str]) -> ScoringInput:
+    cf_scores = collaborative.index.scores(borrowed_ids | collaborative.index.history(user_id))
+    cf_rows = snapshot.rows(cf_scores)
+    return ScoringInput(
+        ids=snapshot.ids,
+        alive=snapshot.alive,
+        genres=snapshot.genres,
+        authors=snapshot.authors,
+        ratings=snapshot.ratings,
+        has_text=snapshot.has_text,
+        sims=snapshot.sims,
+        borrowed_rows=snapshot.rows(borrowed_ids),
+        fav_genre_codes=np.array([snapshot.genre_codes[g] for g in fav_genres if g in snapshot.genre_codes]),
+        fav_author_codes=np.array([snapshot.author_codes[a] for a in fav_authors if a in snapshot.author_codes]),
+        cf_rows=cf_rows,
+        cf_values=np.array([cf_scores[int(book_id)] for book_id in snapshot.ids[cf_rows]]),
+    )
 
 
 async def _hybrid_recommendations(user_id: int, db: AsyncSession, limit: int) -> List[Tuple[Book, float, str]]:
     # Get user's borrowed books
     borrow_result = await db.execute(
-        select(Borrow).where(Borrow.user_id == user_id)
+        select(Borrow.book_id).where(Borrow.user_id == user_id)
     )
-    borrows = borrow_result.scalars().all()
-    borrowed_ids = {b.book_id for b in borrows}
+    borrowed_ids = set(borrow_result.scalars().all())
 
-    # Get all books the user hasn't borrowed
-    books_result = await db.execute(select(Book))
-    all_books = books_result.scalars().all()
-    candidate_books = [b for b in all_books if b.id not in borrowed_ids]
+    fav_genres, fav_authors = await _load_preferences(db, user_id)
 
-    if not candidate_books:
+    await catalog.index.ensure_built(db)
+    await collaborative.index.ensure_built(db)
+    version, columns, inputs, profile, rating_changes = await compute.pool.run_local(
+        prepare_user_scoring, user_id, borrowed_ids, fav_genres, fav_authors
+    )
+    ranked = await compute.pool.run_shared(
+        score_user, "catalog", version, columns, inputs, profile, rating_changes, limit
+    )
+    if not ranked:
+        return []
+
+    # Only the winners are loaded and explained
+    books = await load_many(db, Book, (book_id for book_id, *_ in ranked))
+
+    results = []
+    for book_id, score, flags in ranked:
+        book = books.get(book_id)
+        if book is not None:
+            results.append((book, score, hybrid_reason(book, flags)))
+    return results
+
+
+def score_catalog(inputs: ScoringInput, limit: int) -> List[Tuple[int, float, dict]]:
+    """Score every catalog row at once and return the top ``limit``.
+
+    Returns ``(book_id, score, flags)`` where ``flags`` records which signals
+    fired, so reasons can be built for the winners only.
+    """
+    n = len(inputs.ids)
+    if n == 0 or limit <= 0:
+        return []
+
+    candidates = inputs.alive[:n].copy()
+    candidates[inputs.borrowed_rows] = False
+    n_candidates = int(candidates.sum())
+    if n_candidates == 0:
         return []
 
-    # Get user preferences
-    pref_result = await db.execute(
-        select(UserPreference).where(UserPreference.user_id == user_id)
+    genre_match = np.isin(inputs.genres, inputs.fav_genre_codes)
+    author_match = np.isin(inputs.authors, inputs.fav_author_codes)
+
+    if inputs.sims is not None:
+        sim = np.where(inputs.has_text, inputs.sims[:n], 0.0)
+    else:
+        sim = np.zeros(n)
+
+    history_genres = np.unique(inputs.genres[inputs.borrowed_rows])
+    history_match = np.isin(inputs.genres, history_genres[history_genres >= 0])
+
+    cf = np.zeros(n)
+    cf[inputs.cf_rows] = inputs.cf_values
+
+    scores = (
+        W_GENRE * genre_match
+        + W_AUTHOR * author_match
+        + W_RATING * (inputs.ratings / 5.0)
+        + W_TFIDF * sim
+        + W_HISTORY_GENRE * history_match
+        + W_ITEM_CF * cf
     )
-    prefs = pref_result.scalar_one_or_none()
-    fav_genres = set((prefs.favorite_genres or "").lower().split(",")) if prefs else set()
-    fav_authors = set((prefs.favorite_authors or "").lower().split(",")) if prefs else set()
-
-    # Get books user borrowed (for collaborative content similarity)
-    borrowed_books = [b for b in all_books if b.id in borrowed_ids]
-
-    scored = []
-    for book in candidate_books:
-        score = 0.0
-        reason_parts = []
-
-        # Genre preference score
-        if book.genre and book.genre.lower() in fav_genres:
-            score += 0.4
-            reason_parts.append(f"matches your favorite genre ({book.genre})")
-
-        # Author preference score
-        if book.author and book.author.lower() in fav_authors:
-            score += 0.35
-            reason_parts.append(f"by a favorite author ({book.author})")
-
-        # Rating score (normalize 1-5 to 0-0.2)
-        if book.avg_rating:
-            score += (book.avg_rating / 5.0) * 0.2
-            reason_parts.append(f"highly rated ({book.avg_rating:.1f}/5)")
-
-        # TF-IDF similarity to borrowed books
-        if borrowed_books and book.description:
-            sim = _tfidf_similarity(book, borrowed_books)
-            score += sim * 0.15
-            if sim > 0.1:
-                reason_parts.append("similar to books you've read")
-
-        # Collaborative: same genre as previously borrowed
-        borrowed_genres = {b.genre for b in borrowed_books if b.genre}
-        if book.genre and book.genre in borrowed_genres:
-            score += 0.1
-            if "similar genre" not in " ".join(reason_parts):
-                reason_parts.append("similar genre to your reading history")
-
-        reason = "; ".join(reason_parts) if reason_parts else "popular in the catalog"
-        scored.append((book, round(score, 3), reason))
-
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored[:limit]
-
-
-def _tfidf_similarity(target: Book, candidates: List[Book]) -> float:
-    """Simple TF-IDF cosine similarity between target book and list of books."""
-    try:
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        from sklearn.metrics.pairwise import cosine_similarity
-        import numpy as np
-
-        texts = [target.description or ""] + [b.description or "" for b in candidates]
-        if all(t == "" for t in texts):
-            return 0.0
-
-        vectorizer = TfidfVectorizer(max_features=200, stop_words="english")
-        tfidf = vectorizer.fit_transform(texts)
-        sims = cosine_similarity(tfidf[0:1], tfidf[1:])
-        return float(np.max(sims)) if sims.size > 0 else 0.0
-    except Exception:
-        return 0.0
+    scores = np.round(scores, 3)
+    scores[~candidates] = -np.inf
 
+    k = min(limit, n_candidates)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.lexsort((inputs.ids[top], -scores[top]))]
+
+    return [
+        (
+            int(inputs.ids[i]),
+            float(scores[i]),
+            {
+                "genre": bool(genre_match[i]),
+                "author": bool(author_match[i]),
+                "similar": bool(sim[i] > 0.1),
+                "history_genre": bool(history_match[i]),
+                "co_borrowed": bool(cf[i] > 0.1),
+            },
+        )
+        for i in top
+    ]
+
+
+def hybrid_reason(book: Book, flags: dict) -> str:
+    reason_parts = []
+    if flags["genre"]:
+        reason_parts.append(f"matches your favorite genre ({book.genre})")
+    if flags["author"]:
+        reason_parts.append(f"by a favorite author ({book.author})")
+    if book.avg_rating:
+        reason_parts.append(f"highly rated ({book.avg_rating:.1f}/5)")
+    if flags["similar"]:
+        reason_parts.append("similar to books you've read")
+    if flags["history_genre"]:
+        reason_parts.append("similar genre to your reading history")
+    if flags["co_borrowed"]:
+        reason_parts.append("readers of your books also borrowed this")
+    return "; ".join(reason_parts) if reason_parts else "popular in the catalog"
+
+
+def candidate_query(user_id: int, fav_genres: Set[str], fav_authors: Set[str], limit: int, prefilter: bool = True):
+    """Unborrowed books, preference/rating matches first, id/title/author/genre only."""
+    borrowed = select(Borrow.book_id).where(Borrow.user_id == user_id)
+    preferred = or_(
+        func.lower(func.trim(Book.genre)).in_(fav_genres),
+        func.lower(func.trim(Book.author)).in_(fav_authors),
+    )
+    q = select(Book.id, Book.title, Book.author, Book.genre).where(Book.id.not_in(borrowed))
+    if prefilter:
+        q = q.where(or_(preferred, Book.avg_rating >= settings.CANDIDATE_MIN_RATING))
+    return q.order_by(case((preferred, 0), else_=1), Book.avg_rating.desc().nulls_last(), Book.id).limit(limit)
 
-async def _llm_recommendations(user_id: int, db: AsyncSession, limit: int) -> List[Tuple[Book, float, str]]:
-    from app.services.llm import llm_complete
 
-    borrow_result = await db.execute(select(Borrow).where(Borrow.user_id == user_id))
-    borrows = borrow_result.scalars().all()
-    borrowed_ids = {b.book_id for b in borrows}
+async def _llm_recommendations(user_id: int, db: AsyncSession, limit: int) -> List[Tuple[Book, float, str]]:
+    from app.services.llm import LLMQueueTimeout, llm_complete
 
-    books_result = await db.execute(select(Book))
-    all_books = books_result.scalars().all()
-    borrowed_books = [b for b in all_books if b.id in borrowed_ids]
-    candidates = [b for b in all_books if b.id not in borrowed_ids][:20]  # limit context
+    fav_genres, fav_authors = await _load_preferences(db, user_id)
+    n_candidates = max(limit, LLM_CANDIDATES)  # limit context
+    candidates = (await db.execute(candidate_query(user_id, fav_genres, fav_authors, n_candidates))).all()
+    if len(candidates) < limit:
+        candidates = (
+            await db.execute(candidate_query(user_id, fav_genres, fav_authors, n_candidates, prefilter=False))
+        ).all()
 
     if not candidates:
         return []
 
-    borrowed_titles = [f"{b.title} by {b.author}" for b in borrowed_books[:5]]
+    borrowed_titles = await _history_titles(db, user_id)
     candidate_list = "\n".join([f"{i}. {b.title} by {b.author} (genre: {b.genre})" for i, b in enumerate(candidates)])
 
     prompt = f"""A user has previously read: {', '.join(borrowed_titles) or 'nothing yet'}
@@ -132,13 +400,92 @@ Pick the top {min(limit, len(candidates))} books for this user and respond ONLY
 
 Numbers:"""
 
-    result = await llm_complete(prompt)
     try:
-        indices = [int(x.strip()) for x in result.split(",") if x.strip().isdigit()]
-        recommendations = []
-        for idx in indices[:limit]:
-            if 0 <= idx < len(candidates):
-                recommendations.append((candidates[idx], 0.8, "Recommended by AI based on your reading history"))
-        return recommendations
+        result = await llm_complete(prompt)
+    except LLMQueueTimeout:
+        return await _load_ranked(db, [(b.id, 0.5, "AI recommendation") for b in candidates[:limit]])
+    try:
+        indices = _parse_indices(result, len(candidates))
+        picks = [(candidates[idx].id, 0.8, "Recommended by AI based on your reading history")
+                 for idx in indices[:limit]]
     except Exception:
-        return [(b, 0.5, "AI recommendation") for b in candidates[:limit]]
+        picks = [(b.id, 0.5, "AI recommendation") for b in candidates[:limit]]
+    return await _load_ranked(db, picks)
+
+
+async def _rerank_recommendations(
+    user_id: int, db: AsyncSession, limit: int
+) -> Tuple[List[Tuple[Book, float, str]], bool]:
+    """Hybrid scorer retrieves the top-K, the LLM reorders them.
+
+    The LLM order is cached by a hash of the prompt (reading history plus
+    candidate set). If the model misses the latency budget the hybrid order
+    is returned and the call finishes in the background to fill the cache;
+    requests for the same prompt meanwhile wait on that call, not a new one.
+    Returns ``(results, reranked)``.
+    """
+    from app.services.llm import llm_complete
+
+    hybrid = await _hybrid_recommendations(user_id, db, max(limit, settings.RERANK_CANDIDATES))
+    if not hybrid:
+        return [], True
+
+    borrowed_titles = await _history_titles(db, user_id)
+    candidate_list = "\n".join(
+        [f"{i}. {b.title} by {b.author} (genre: {b.genre})" for i, (b, _, _) in enumerate(hybrid)]
+    )
+    prompt = f"""A user has previously read: {', '.join(borrowed_titles) or 'nothing yet'}
+
+These books were shortlisted for them:
+{candidate_list}
+
+Rank the {min(limit, len(hybrid))} best books for this user and respond ONLY with a comma-separated list of the numbers, best first (e.g., 3,0,5).
+
+Numbers:"""
+    key = hashlib.sha256(prompt.encode()).hexdigest()
+
+    order = _rerank_cache.get(key)
+    if order is None:
+        task = _rerank_tasks.get(key)
+        if task is None:
+            task = _rerank_tasks[key] = asyncio.create_task(llm_complete(prompt))
+            task.add_done_callback(lambda t: _store_rerank(key, t, len(hybrid)))
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=settings.RERANK_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+        order = _rerank_cache.get(key)
+    if not order:
+        return hybrid[:limit], False
+
+    chosen = set(order)
+    ranked = [hybrid[i] for i in order] + [item for i, item in enumerate(hybrid) if i not in chosen]
+    return [
+        (book, round(1.0 - pos / len(ranked), 3), f"AI pick from your top matches; {reason}")
+        for pos, (book, _, reason) in enumerate(ranked[:limit])
+    ], True
+
+
+def _store_rerank(key: str, task: asyncio.Task, n: int):
+    _rerank_tasks.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    order = list(dict.fromkeys(_parse_indices(task.result(), n)))
+    if order:
+        _rerank_cache.set(key, order)
+
+
+async def _history_titles(db: AsyncSession, user_id: int, n: int = 5) -> List[str]:
+    result = await db.execute(
+        select(Book.title, Book.author)
+        .join(Borrow, Borrow.book_id == Book.id)
+        .where(Borrow.user_id == user_id)
+        .order_by(Borrow.borrowed_at.desc())
+        .limit(n)
+    )
+    return [f"{title} by {author}" for title, author in result.all()]
+
+
+def _parse_indices(text: str, n: int) -> List[int]:
+    indices = [int(x.strip()) for x in text.split(",") if x.strip().isdigit()]
+    return [i for i in indices if 0 <= i < n]
@@ -0,0 +1,65 @@
+"""
+Catalog search.
+On Postgres, queries match the books.search_vector GIN index (title, author, genre and
+description, weighted in that order) and are ordered by ts_rank_cd. Every term must match and
+the last one matches as a prefix, so results update usefully while the user is still typing.
+If nothing matches (a typo, or only stop words), the first page falls back to trigram word
+similarity on title and author, which uses the pg_trgm indexes.
+Other databases (SQLite in development) use a substring match.
+"""
+import re
+from typing import List
+
+from sqlalchemy import Select, func, literal, literal_column, or_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.book import Book
+
+MAX_TERMS = 8
+_TERM = re.compile(r"\w+")
+
+search_vector = literal_column("books.search_vector", TSVECTOR)
+
+
+def ts_query(text: str) -> str:
+    """``"dune mess"`` -> ``"dune & mess:*"``; empty when there are no word characters."""
+    terms = _TERM.findall(text.lower())[:MAX_TERMS]
+    if not terms:
+        return ""
+    terms[-1] += ":*"
+    return " & ".join(terms)
+
+
+def ranked(q: Select, text: str) -> Select:
+    query = func.to_tsquery(settings.SEARCH_TEXT_CONFIG, ts_query(text))
+    return q.where(search_vector.op("@@")(query)).order_by(
+        func.ts_rank_cd(search_vector, query).desc(), Book.id
+    )
+
+
+def fuzzy(q: Select, text: str) -> Select:
+    term = literal(text)
+    return q.where(or_(term.op("<%")(Book.title), term.op("<%")(Book.author))).order_by(
+        func.greatest(func.word_similarity(term, Book.title), func.word_similarity(term, Book.author)).desc(),
+        Book.id,
+    )
+
+
+def substring(q: Select, text: str) -> Select:
+    return q.where(Book.title.ilike(f"%{text}%") | Book.author.ilike(f"%{text}%"))
+
+
+async def books(db: AsyncSession, q: Select, text: str, skip: int, limit: int) -> List[Book]:
+    """Apply the search for ``text`` to the book query ``q`` and return one page."""
+    if db.bind.dialect.name != "postgresql":
+        result = await db.execute(substring(q, text).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    found = []
+    if ts_query(text):
+        found = (await db.execute(ranked(q, text).offset(skip).limit(limit))).scalars().all()
+    if not found and skip == 0:
+        found = (await db.execute(fuzzy(q, text).limit(limit))).scalars().all()
+    return found
@@ -0,0 +1,240 @@
+"""
+Review sentiment: a local fast path, then micro-batched LLM calls.
+
+The local classifier is a scikit-learn model trained on existing reviews
+(python -m app.cli train-sentiment) or, until one exists, a small lexicon.
+Reviews it labels with confidence >= SENTIMENT_LOCAL_THRESHOLD never reach the
+LLM. The rest arriving within SENTIMENT_BATCH_WINDOW_MS of each other (up to
+SENTIMENT_BATCH_SIZE) are classified in one LLM call; each caller awaits its
+own future. Items the batch answer doesn't cover fall back to the
+single-review prompt; if the batch call itself fails, every caller gets its
+error (jobs retry with backoff) rather than N single-review calls.
+Labels are stored with their source so the local model is only ever
+retrained on LLM labels (or star ratings), never on its own output.
+"""
+import asyncio
+import os
+import pickle
+import re
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services import llm
+
+POSITIVE_WORDS = frozenset("""
+amazing awesome beautiful beautifully best brilliant captivating charming compelling delight
+delightful enjoy enjoyed enjoyable excellent fantastic favorite favourite fun gem gripping great
+heartwarming incredible insightful inspiring interesting love loved lovely masterpiece moving
+must-read outstanding page-turner perfect phenomenal pleasure recommend recommended riveting
+stunning superb terrific thoughtful wonderful wonderfully worth good nice liked solid
+""".split())
+NEGATIVE_WORDS = frozenset("""
+annoying awful bad bland boring confusing disappointed disappointing dull forgettable hate hated
+horrible mediocre messy meh overrated pointless poor poorly predictable shallow slow tedious
+terrible tiresome unreadable waste weak worse worst
+""".split())
+NEGATIONS = frozenset("not no never nothing hardly barely isn't wasn't didn't don't doesn't can't couldn't".split())
+_TOKEN = re.compile(r"[a-z][a-z'-]*|[.,;:!?]")
+
+
+def label_for_rating(rating: int) -> str:
+    return "positive" if rating >= 4 else "negative" if rating <= 2 else "neutral"
+
+
+def lexicon_score(text: str) -> Tuple[str, float]:
+    """``(label, confidence)`` from word polarity; a negation flips the next three words
+    up to the end of the clause."""
+    pos = neg = 0
+    flip_until = -1
+    for i, token in enumerate(_TOKEN.findall(text.lower())):
+        if token in NEGATIONS:
+            flip_until = i + 3
+            continue
+        if not token[0].isalpha():
+            flip_until = -1
+            continue
+        polarity = (token in POSITIVE_WORDS) - (token in NEGATIVE_WORDS)
+        if i <= flip_until:
+            polarity = -polarity
+        pos += polarity > 0
+        neg += polarity < 0
+    hits = pos + neg
+    if not hits:
+        return "neutral", 0.0
+    # Agreement between cues, discounted when there is only one
+    confidence = abs(pos - neg) / hits * min(1.0, hits / 2)
+    return ("positive" if pos > neg else "negative" if neg > pos else "neutral"), confidence
+
+
+def train_model(samples: Iterable[Tuple[str, str]]):
+    """Fit a TF-IDF + logistic regression classifier on ``(text, label)`` pairs."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    texts, labels = zip(*samples)
+    model = make_pipeline(
+        TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True, max_features=50000),
+        LogisticRegression(max_iter=1000, class_weight="balanced"),
+    )
+    model.fit(texts, labels)
+    return model
+
+
+class LocalClassifier:
+    def __init__(self, path: Path, threshold: float):
+        self.path = path
+        self.threshold = threshold
+        self.model = None
+        self.checked = 0
+        self.confident = 0
+        self.seconds = 0.0
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                self.model = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, model):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(model, f)
+        os.replace(tmp, self.path)
+        self.model = model
+
+    def score(self, text: str) -> Tuple[str, float]:
+        if self.model is None:
+            return lexicon_score(text)
+        probs = self.model.predict_proba([text])[0]
+        best = probs.argmax()
+        return str(self.model.classes_[best]), float(probs[best])
+
+    def classify(self, text: str) -> Optional[str]:
+        """Label when confident enough, otherwise None (send to the LLM)."""
+        started = time.perf_counter()
+        label, confidence = self.score(text)
+        self.seconds += time.perf_counter() - started
+        self.checked += 1
+        if confidence >= self.threshold:
+            self.confident += 1
+            return label
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "model": "sklearn" if self.model is not None else "lexicon",
+            "threshold": self.threshold,
+            "checked": self.checked,
+            "confident": self.confident,
+            "llm_fallbacks": self.checked - self.confident,
+            "fallback_rate": round(1 - self.confident / self.checked, 4) if self.checked else 0.0,
+            "avg_us": round(self.seconds / self.checked * 1e6, 1) if self.checked else 0.0,
+        }
+
+
+class SentimentBatcher:
+    def __init__(self, max_batch: int, window: float):
+        self.max_batch = max_batch
+        self.window = window
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.items = 0
+        self.batches = 0
+        self.llm_calls = 0
+        self.fallbacks = 0
+
+    async def classify(self, text: str) -> str:
+        if not text:
+            return "neutral"
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.items += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        self.batches += 1
+        texts = list(dict.fromkeys(text for text, _ in batch))  # identical reviews share a slot
+        results: dict = dict.fromkeys(texts)
+        if len(texts) > 1:
+            self.llm_calls += 1
+            try:
+                results.update(zip(texts, await llm.analyze_review_sentiments(texts)))
+            except Exception as e:
+                # The provider is failing: don't multiply the load with per-review retries here,
+                # fail the callers and let their jobs back off
+                results = dict.fromkeys(texts, e)
+
+        missing = [text for text in texts if results[text] is None]
+        if missing:
+            self.llm_calls += len(missing)
+            if len(texts) > 1:
+                self.fallbacks += len(missing)
+            answers = await asyncio.gather(
+                *(llm.analyze_review_sentiment(text) for text in missing), return_exceptions=True
+            )
+            results.update(zip(missing, answers))
+
+        for text, future in batch:
+            if future.done():
+                continue
+            if isinstance(results[text], BaseException):
+                future.set_exception(results[text])
+            else:
+                future.set_result(results[text])
+
+    def stats(self) -> dict:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "llm_calls": self.llm_calls,
+            "fallbacks": self.fallbacks,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
+
+
+async def classify(text: str) -> Tuple[str, str]:
+    """``(label, source)``, where source is ``"local"`` or ``"llm"``."""
+    if not text:
+        return "neutral", "local"
+    if settings.SENTIMENT_LOCAL_ENABLED:
+        label = local.classify(text)
+        if label is not None:
+            return label, "local"
+    return await batcher.classify(text), "llm"
+
+
+def stats() -> dict:
+    return {"local": local.stats(), **batcher.stats()}
+
+
+local = LocalClassifier(
+    path=Path(settings.INDEX_DIR) / "sentiment.pkl",
+    threshold=settings.SENTIMENT_LOCAL_THRESHOLD,
+)
+batcher = SentimentBatcher(
+    max_batch=settings.SENTIMENT_BATCH_SIZE,
+    window=settings.SENTIMENT_BATCH_WINDOW_MS / 1000,
+)
@@ -0,0 +1,83 @@
+"""
+Background job handlers. Importing this module registers them with app.services.jobs.
+"""
+import hashlib
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db import AsyncSessionLocal
+from app.models.book import Book
+from app.models.review import Review
+from app.services import jobs, llm, sentiment
+
+
+@jobs.handler("book_summary", concurrency=2)
+async def generate_summary(book_id: Optional[int], payload: dict):
+    """Generate the AI summary for a newly added book."""
+    async with AsyncSessionLocal() as db:
+        book = await db.get(Book, book_id)
+        if not book or book.ai_summary:  # already streamed via /books/{id}/summary/stream
+            return
+        book.ai_summary = await llm.generate_book_summary(book.title, book.author, book.description or "")
+        await db.commit()
+
+
+# High enough that concurrent reviews reach the sentiment batcher together
+@jobs.handler("review_sentiment", concurrency=8)
+async def analyze_sentiment(review_id: Optional[int], payload: dict):
+    """Sentiment analysis: local classifier, else batched with other reviews for the LLM."""
+    async with AsyncSessionLocal() as db:
+        review = await db.get(Review, review_id)
+        if review:
+            label, source = await sentiment.classify(review.text or "")
+            # Plain UPDATE: the review may have been deleted while we waited on the LLM
+            await db.execute(
+                update(Review).where(Review.id == review_id).values(sentiment=label, sentiment_source=source)
+            )
+            await db.commit()
+
+
+async def enqueue_consensus(db: AsyncSession, book_id: int):
+    """Debounced: a burst of reviews on one book collapses into a single refresh."""
+    await jobs.enqueue(
+        db,
+        "book_consensus",
+        book_id,
+        delay=settings.CONSENSUS_QUIET_SECONDS,
+        max_delay=settings.CONSENSUS_MAX_DELAY_SECONDS,
+    )
+
+
+def review_fingerprint(reviews: list[Review]) -> str:
+    digest = hashlib.sha256()
+    for r in reviews:
+        digest.update(f"{r.id}\0{r.rating}\0{r.text or ''}\0".encode())
+    return digest.hexdigest()
+
+
+@jobs.handler("book_consensus", concurrency=2)
+async def refresh_consensus(book_id: Optional[int], payload: dict):
+    """Regenerate consensus if the summarized reviews changed."""
+    async with AsyncSessionLocal() as db:
+        book = await db.get(Book, book_id)
+        if not book:
+            return
+
+        # Generate consensus from the latest reviews
+        reviews_result = await db.execute(
+            select(Review)
+            .where(Review.book_id == book_id)
+            .order_by(Review.created_at.desc(), Review.id.desc())
+            .limit(10)
+        )
+        reviews = reviews_result.scalars().all()
+        fingerprint = review_fingerprint(reviews)
+        if fingerprint != book.consensus_fingerprint:
+            review_dicts = [{"rating": r.rating, "text": r.text} for r in reviews]
+            book.review_consensus = await llm.generate_review_consensus(review_dicts)
+            book.consensus_fingerprint = fingerprint
+
+        await db.commit()
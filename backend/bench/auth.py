@@ -0,0 +1,114 @@
+"""
+Login throughput benchmark.
+
+Drives the API in-process with a burst of concurrent logins while probing GET /health, and
+reports login throughput and probe latency. --inline hashes on the event loop, as the handlers
+used to, for comparison: there every login stalls the probe for a full bcrypt call.
+
+    cd backend
+    pip install aiosqlite            # only needed for the default SQLite target
+    python -m bench.auth --logins 200 --concurrency 32
+    python -m bench.auth --logins 200 --concurrency 32 --inline
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from bench.recommendations import percentile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m bench.auth")
+    parser.add_argument("--db-url", default="sqlite+aiosqlite:///bench-auth.db")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--probe-interval-ms", type=float, default=10)
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop (old behaviour)")
+    return parser.parse_args()
+
+
+def summarize(name, values):
+    return (f"{name}: p50 {percentile(values, 50) * 1000:.1f} ms, p99 {percentile(values, 99) * 1000:.1f} ms, "
+            f"max {max(values) * 1000:.1f} ms")
+
+
+async def run(args):
+    import httpx
+
+    from app.core import security
+    from app.core.config import settings
+    from app.db import init_db
+    from app.main import app
+
+    if args.inline:
+        async def inline(fn, *fn_args):
+            return fn(*fn_args)
+
+        security.hasher.run = inline
+
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        names = [f"bench{i}" for i in range(args.users)]
+        for name in names:
+            r = await client.post("/auth/register", json={"email": f"{name}@example.com", "username": name,
+                                                          "password": "bench-password"})
+            r.raise_for_status()
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        login_times, statuses = [], {}
+
+        async def login(i):
+            async with semaphore:
+                started = time.perf_counter()
+                r = await client.post("/auth/login", data={"username": names[i % len(names)],
+                                                           "password": "bench-password"})
+                login_times.append(time.perf_counter() - started)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        probe_times = []
+        done = asyncio.Event()
+
+        async def probe():
+            # Timed from when the probe was due, so time spent waiting for a blocked loop counts
+            interval = args.probe_interval_ms / 1000
+            while not done.is_set():
+                due = time.perf_counter() + interval
+                await asyncio.sleep(interval)
+                await client.get("/health")
+                probe_times.append(time.perf_counter() - due)
+
+        prober = asyncio.create_task(probe())
+        await asyncio.sleep(0.2)
+        idle = list(probe_times)
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+        busy = probe_times[len(idle):]
+
+    print(f"mode: {'inline' if args.inline else 'pool'}, bcrypt rounds {settings.BCRYPT_ROUNDS}, "
+          f"{settings.PASSWORD_HASH_WORKERS} hash workers, queue limit {settings.PASSWORD_HASH_MAX_QUEUE}")
+    print(f"logins: {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), statuses {statuses}")
+    print(summarize("login latency", login_times))
+    if idle:
+        print(summarize("/health idle", idle))
+    if busy:
+        print(summarize("/health during burst", busy))
+    if not args.inline:
+        print(f"hasher: {security.hasher.stats()}")
+
+
+def main():
+    args = parse_args()
+    os.environ["DB_URL"] = args.db_url
+    if args.db_url.startswith("sqlite") and os.path.exists("bench-auth.db"):
+        os.remove("bench-auth.db")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+LLM client benchmark against a local mock Ollama server.
+
+Compares a fresh httpx.AsyncClient per call (the old behaviour) with the
+pooled client in app.services.llm, and counts TCP connections the server sees.
+
+    cd backend
+    python -m bench.llm --requests 2000 --concurrency 50 --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from bench.recommendations import percentile
+
+
+class MockOllama:
+    """Minimal HTTP/1.1 keep-alive server answering POST /api/generate."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(self.latency)
+                self.requests += 1
+                body = json.dumps({"response": "positive", "done": True}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def per_call_client(prompt: str) -> str:
+    """The pre-pooling implementation: a new client (and connection) every call."""
+    import httpx
+
+    from app.core.config import settings
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        resp = await client.post(
+            f"{settings.OLLAMA_BASE_URL}/api/generate",
+            json={"model": "llama3.2", "prompt": prompt, "stream": False},
+        )
+        resp.raise_for_status()
+        return resp.json()["response"]
+
+
+async def run(name: str, call, server: MockOllama, args) -> dict:
+    server.connections = 0
+    latencies = []
+    remaining = args.requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            await call("Analyze the sentiment of this book review.")
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "client": name,
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "connections": server.connections,
+    }
+
+
+async def main(args):
+    server = MockOllama(args.latency_ms / 1000)
+    port = await server.start()
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{port}"
+
+    from app.core.config import settings
+    from app.services import llm
+
+    settings.OLLAMA_BASE_URL = os.environ["OLLAMA_BASE_URL"]
+    settings.LLM_PROVIDER = "ollama"
+    settings.LLM_MAX_CONNECTIONS = args.concurrency
+    settings.LLM_MAX_KEEPALIVE_CONNECTIONS = args.concurrency
+    await llm.startup()
+
+    results = [
+        await run("per-call", per_call_client, server, args),
+        await run("pooled", llm._ollama_complete, server, args),
+    ]
+    await llm.shutdown()
+    await server.stop()
+
+    header = f"{'client':<10}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'connections':>13}"
+    print(header + "\n" + "-" * len(header))
+    for r in results:
+        print(f"{r['client']:<10}{r['p50_ms']:>10}{r['p99_ms']:>10}{r['throughput_rps']:>10}{r['connections']:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m bench.llm")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated model latency")
+    asyncio.run(main(parser.parse_args()))
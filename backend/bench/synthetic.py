@@ -0,0 +1,150 @@
+"""
+Synthetic LibraryHub data for benchmarks.
+
+Popularity (books per author, borrows per book, words in descriptions) follows
+Zipf-like distributions so the catalog looks like a real one to TF-IDF and
+collaborative filtering. Everything is seeded and reproducible.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Book, Borrow, Review, User, UserPreference
+
+GENRES = [
+    "fantasy", "science fiction", "mystery", "thriller", "romance", "horror", "historical",
+    "biography", "poetry", "philosophy", "history", "science", "travel", "cooking",
+    "self-help", "business", "children", "young adult", "graphic novel", "classics",
+]
+
+
+@dataclass
+class Scale:
+    books: int
+    users: int
+    borrows_per_user: float = 15.0
+    review_rate: float = 0.3  # fraction of borrows that get a review
+    preference_rate: float = 0.5  # fraction of users with saved preferences
+
+
+SCALES = {
+    "1k": Scale(books=1_000, users=500),
+    "100k": Scale(books=100_000, users=20_000),
+    "1m": Scale(books=1_000_000, users=100_000),
+}
+
+
+@lru_cache(maxsize=None)
+def _zipf_cdf(n: int, a: float) -> np.ndarray:
+    p = np.arange(1, n + 1, dtype=np.float64) ** -a
+    return np.cumsum(p / p.sum())
+
+
+def _zipf_choice(rng: np.random.Generator, n: int, size: int, a: float = 1.1) -> np.ndarray:
+    """Indices in [0, n) with a heavy head, like book or word popularity."""
+    return np.minimum(np.searchsorted(_zipf_cdf(n, a), rng.random(size)), n - 1)
+
+
+def _vocabulary(rng: np.random.Generator, size: int = 20_000) -> np.ndarray:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(3, 11, size=size)
+    return np.array(["".join(rng.choice(letters, size=n)) for n in lengths])
+
+
+def descriptions(rng: np.random.Generator, n: int, genre_idx: np.ndarray):
+    """Yield ``n`` descriptions of ~40-400 words with genre-specific vocabulary."""
+    vocab = _vocabulary(rng)
+    genre_words = [rng.choice(len(vocab), size=200, replace=False) for _ in GENRES]
+    lengths = np.clip(rng.lognormal(mean=4.6, sigma=0.5, size=n).astype(int), 40, 400)
+    for i in range(n):
+        common = _zipf_choice(rng, len(vocab), lengths[i] * 3 // 4)
+        topical = rng.choice(genre_words[genre_idx[i]], size=lengths[i] - len(common))
+        words = vocab[np.concatenate([common, topical])]
+        rng.shuffle(words)
+        yield " ".join(words)
+
+
+async def populate(db: AsyncSession, scale: Scale, seed: int = 0, batch: int = 5_000) -> dict:
+    """Insert users, books, borrows, reviews and preferences. Returns row counts."""
+    rng = np.random.default_rng(seed)
+
+    await _insert(db, User, (
+        {"email": f"user{i}@bench.local", "username": f"user{i}", "hashed_password": "x"}
+        for i in range(scale.users)
+    ), batch)
+    user_ids = (await db.execute(select(User.id).order_by(User.id))).scalars().all()
+
+    n_authors = max(1, scale.books // 8)
+    genre_idx = _zipf_choice(rng, len(GENRES), scale.books, a=0.8)
+    author_idx = _zipf_choice(rng, n_authors, scale.books)
+    ratings = np.round(np.clip(rng.normal(3.7, 0.7, size=scale.books), 1, 5), 2)
+    rated = rng.random(scale.books) < 0.6
+    await _insert(db, Book, (
+        {
+            "title": f"Synthetic Book {i}",
+            "author": f"Author {author_idx[i]}",
+            "isbn": f"bench-{i}",
+            "description": text,
+            "genre": GENRES[genre_idx[i]],
+            "year": int(1900 + i % 125),
+            "total_copies": 3,
+            "available_copies": 3,
+            "avg_rating": float(ratings[i]) if rated[i] else None,
+        }
+        for i, text in enumerate(descriptions(rng, scale.books, genre_idx))
+    ), batch)
+    book_ids = np.asarray((await db.execute(select(Book.id).order_by(Book.id))).scalars().all())
+
+    borrows, reviews = [], []
+    counts = rng.poisson(scale.borrows_per_user, size=len(user_ids))
+    for user_id, count in zip(user_ids, counts):
+        picks = np.unique(book_ids[_zipf_choice(rng, len(book_ids), max(int(count), 1), a=0.9)])
+        for book_id in picks:
+            borrows.append({"user_id": user_id, "book_id": int(book_id), "is_returned": bool(rng.random() < 0.8)})
+            if rng.random() < scale.review_rate:
+                reviews.append({
+                    "user_id": user_id,
+                    "book_id": int(book_id),
+                    "rating": int(rng.integers(1, 6)),
+                    "text": "Synthetic review text for benchmarking.",
+                })
+    await _insert(db, Borrow, iter(borrows), batch)
+    await _insert(db, Review, iter(reviews), batch)
+
+    prefs = []
+    for user_id in user_ids:
+        if rng.random() < scale.preference_rate:
+            genres = rng.choice(len(GENRES), size=2, replace=False)
+            prefs.append({
+                "user_id": user_id,
+                "favorite_genres": ",".join(GENRES[g] for g in genres),
+                "favorite_authors": f"Author {int(_zipf_choice(rng, n_authors, 1)[0])}",
+            })
+    await _insert(db, UserPreference, iter(prefs), batch)
+
+    return {
+        "users": len(user_ids),
+        "books": len(book_ids),
+        "borrows": len(borrows),
+        "reviews": len(reviews),
+        "preferences": len(prefs),
+    }
+
+
+async def row_count(db: AsyncSession, model) -> int:
+    return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+async def _insert(db: AsyncSession, model, rows, batch: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch:
+            await db.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        await db.execute(insert(model), chunk)
+    await db.commit()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+import pytest
+
+# Before anything imports app.core.config: a throwaway SQLite database, no in-process job worker
+_tmp = tempfile.mkdtemp(prefix="libraryhub-tests-")
+os.environ.update({
+    "DB_URL": f"sqlite+aiosqlite:///{_tmp}/test.db",
+    "INDEX_DIR": f"{_tmp}/data",
+    "LOCAL_STORAGE_PATH": f"{_tmp}/uploads",
+    "LLM_PROVIDER": "mock",
+    "JOB_WORKER_IN_PROCESS": "false",
+    "BCRYPT_ROUNDS": "4",
+})
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
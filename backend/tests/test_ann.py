@@ -0,0 +1,45 @@
+"""Catalog changes show up in similar-book search before, and trigger, a rebuild."""
+from app.services.ann import AnnIndex, build_arrays, write_index
+
+DOCS = [
+    (1, "space opera starships galaxy empire war"),
+    (2, "starships galaxy empire rebellion war"),
+    (3, "galaxy empire starships war fleet"),
+    (4, "village romance tea garden letters"),
+    (5, "romance garden letters summer village"),
+    (6, "tea garden village romance wedding"),
+]
+
+
+def make_index(tmp_path, ratio=0.5):
+    write_index(build_arrays(DOCS, dim=4), tmp_path)
+    index = AnnIndex(tmp_path, nprobe=8, dim=4, rebuild_ratio=ratio, rebuild_seconds=0)
+    assert index.load()
+    return index
+
+
+def test_removed_books_are_not_returned(tmp_path):
+    index = make_index(tmp_path)
+    assert 2 in [i for i, _ in index.search(1, DOCS[0][1], 5)]
+    index.removed(2)
+    assert 2 not in [i for i, _ in index.search(1, DOCS[0][1], 5)]
+
+
+def test_edited_book_is_searched_by_its_new_text(tmp_path):
+    index = make_index(tmp_path)
+    index.changed(1)
+    hits = index.search(1, "village romance garden letters tea", 2)
+    assert {i for i, _ in hits} <= {4, 5, 6}
+
+
+def test_enough_changes_make_the_index_stale(tmp_path):
+    index = make_index(tmp_path, ratio=0.4)
+    assert not index.stale
+    index.changed(7)
+    index.removed(4)
+    assert not index.stale
+    index.changed(8)
+    assert index.stale
+    index = make_index(tmp_path)
+    index.mark_stale()
+    assert index.stale
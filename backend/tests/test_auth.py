@@ -0,0 +1,60 @@
+"""Cached principals: no statements on a hit, and deactivation takes effect at once."""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.core import security
+from app.db import AsyncSessionLocal, engine
+from app.models.user import User
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def login(client, name: str) -> str:
+    password = "pw-" + name
+    r = client.post("/auth/register", json={"email": f"{name}@example.com", "username": name, "password": password})
+    assert r.status_code == 201, r.text
+    r = client.post("/auth/login", data={"username": name, "password": password})
+    return r.json()["access_token"]
+
+
+async def deactivate(user_id: int):
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        user.is_active = False
+        await db.commit()
+
+
+def test_deactivated_user_is_rejected_on_the_next_request(client):
+    headers = {"Authorization": "Bearer " + login(client, "auth-deactivated")}
+    r = client.get("/auth/me", headers=headers)
+    assert r.status_code == 200
+    assert security.principals.get(r.json()["id"]) is not None
+    client.portal.call(deactivate, r.json()["id"])
+    assert client.get("/auth/me", headers=headers).status_code == 403
+
+
+async def authenticate(token: str):
+    async with AsyncSessionLocal() as db:
+        return await security.get_current_user(token, db)
+
+
+def test_cached_principal_runs_no_statements(client):
+    token = login(client, "auth-cached")
+    first = client.portal.call(authenticate, token)
+    with count_statements() as statements:
+        again = client.portal.call(authenticate, token)
+    assert again == first
+    assert statements == []
@@ -0,0 +1,42 @@
+"""Changes that arrive while the catalog index is being rebuilt survive the swap."""
+from types import SimpleNamespace
+
+from app.services.catalog import CatalogIndex
+
+
+def book(id_, description, genre="sf", author="A", avg_rating=None):
+    return SimpleNamespace(id=id_, description=description, genre=genre, author=author, avg_rating=avg_rating)
+
+
+def row(b):
+    return (b.id, b.description, b.genre, b.author, b.avg_rating)
+
+
+def live(index):
+    snap = index.snapshot()
+    return {int(i): float(r) for i, r, alive in zip(snap.ids, snap.ratings, snap.alive) if alive}
+
+
+def test_rebuild_replays_changes_made_while_reading():
+    index = CatalogIndex(max_features=100, refit_ratio=0.5, refresh_seconds=0)
+    index.upsert(book(1, "space opera"))  # before the first build: queued, not dropped
+    committed = [book(1, "space opera"), book(2, "desert planet"), book(3, "robot detective")]
+
+    # ensure_built: take the queue, then read the rows while other requests keep writing
+    queued = dict(index._pending)
+    index._rerated = {}
+    index.upsert(book(4, "generation ship"))
+    index.remove(3)
+    index.set_rating(2, 4.5)
+    index.build([row(b) for b in committed], queued)
+    index._rerated = None
+
+    assert live(index) == {1: 0.0, 2: 4.5, 4: 0.0}
+
+
+def test_upsert_after_mark_stale_is_kept():
+    index = CatalogIndex(max_features=100, refit_ratio=0.5, refresh_seconds=0)
+    index.build([row(book(1, "space opera"))])
+    index.mark_stale()
+    index.upsert(book(2, "desert planet"))
+    assert live(index) == {1: 0.0, 2: 0.0}
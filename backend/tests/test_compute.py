@@ -0,0 +1,51 @@
+"""Process-mode scoring ships the catalog to each worker once per version."""
+import numpy as np
+import pytest
+
+from app.services import catalog, compute, recommendations
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_shared_value_is_sent_once_per_key():
+    pool = compute.ComputePool("process", workers=1, max_concurrency=1)
+    try:
+        assert await pool.run_shared(len, "catalog", 1, [1, 2, 3]) == 3
+        assert await pool.run_shared(len, "catalog", 1, [1, 2, 3]) == 3
+        assert pool.shared_sends == 1
+        assert await pool.run_shared(len, "catalog", 2, [1, 2]) == 2
+        assert pool.shared_sends == 2
+    finally:
+        pool.shutdown()
+
+
+def test_score_user_matches_score_catalog(monkeypatch):
+    monkeypatch.setattr(catalog, "index", catalog.CatalogIndex(max_features=100, refit_ratio=0.2, refresh_seconds=0))
+    catalog.index.build([
+        (1, "space opera with starships", "sf", "Banks", 4.5),
+        (2, "desert planet and spice", "sf", "Herbert", 4.8),
+        (3, "starships at war in deep space", "sf", "Banks", 3.9),
+        (4, "a quiet village romance", "romance", "Austen", 4.1),
+    ])
+    args = (7, {1}, {"sf"}, {"banks"})
+    expected = recommendations.score_catalog(recommendations.prepare_scoring(*args), 3)
+    _, columns, inputs, profile, rating_changes = recommendations.prepare_user_scoring(*args)
+    assert recommendations.score_user(columns, inputs, profile, rating_changes, 3) == expected
+    assert expected[0][0] == 3 and expected[0][2]["similar"]
+    assert np.asarray(inputs.ids).size == 0  # the per-call part carries no catalog arrays
+
+
+def test_rating_updates_travel_as_deltas(monkeypatch):
+    monkeypatch.setattr(catalog, "index", catalog.CatalogIndex(max_features=100, refit_ratio=0.2, refresh_seconds=0))
+    catalog.index.build([(i, f"book number {i}", "sf", f"Author {i}", 3.0) for i in range(1, 6)])
+    args = (7, set(), {"sf"}, set())
+    version, columns, *_ = recommendations.prepare_user_scoring(*args)
+    worker_copy = columns._replace(ratings=columns.ratings.copy())  # what a process worker holds
+
+    catalog.index.set_rating(4, 5.0)
+    new_version, _, inputs, profile, rating_changes = recommendations.prepare_user_scoring(*args)
+
+    assert new_version == version
+    ranked = recommendations.score_user(worker_copy, inputs, profile, rating_changes, 2)
+    assert ranked == recommendations.score_catalog(recommendations.prepare_scoring(*args), 2)
+    assert ranked[0][0] == 4
@@ -0,0 +1,76 @@
+"""CSV parsing edge cases and per-row error reporting when a batch is rejected."""
+import pytest
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal
+from app.models.book import Book
+from app.services import importer
+
+
+async def chunked(data: bytes, size: int = 7):
+    """Feed the parser in small chunks so records straddle chunk boundaries."""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def parse_csv(text: str):
+    return [parsed async for parsed in importer.parse(chunked(text.encode()), "csv")]
+
+
+@pytest.mark.anyio
+async def test_quoted_field_keeps_newlines_and_escaped_quotes():
+    parsed = await parse_csv(
+        'title,author,description\n'
+        'Dune,Herbert,"A ""desert"" planet,\nspice\n\nand worms"\n'
+        'Emma,Austen,Matchmaking\n'
+    )
+    assert parsed == [
+        (2, {"title": "Dune", "author": "Herbert", "description": 'A "desert" planet,\nspice\n\nand worms'}, None),
+        (6, {"title": "Emma", "author": "Austen", "description": "Matchmaking"}, None),
+    ]
+
+
+@pytest.mark.anyio
+async def test_row_with_wrong_field_count_is_reported_on_its_line():
+    parsed = await parse_csv("title,author\nDune,Herbert,extra\nEmma\nIvanhoe,Scott\n")
+    assert parsed == [
+        (2, None, "expected 2 fields, got 3"),
+        (3, None, "expected 2 fields, got 1"),
+        (4, {"title": "Ivanhoe", "author": "Scott"}, None),
+    ]
+
+
+def book(title: str, isbn=None) -> dict:
+    return importer.validate({"title": title, "author": "Importer", "isbn": isbn})
+
+
+async def write(rows, update=True):
+    async with AsyncSessionLocal() as db:
+        written, errors = await importer._write(db, rows, update)
+        isbns = {row[1]["isbn"] for row in rows if row[1]["isbn"]}
+        titles = (await db.execute(
+            select(Book.isbn, Book.title).where(Book.isbn.in_(isbns)).order_by(Book.isbn)
+        )).all()
+    return written, errors, [tuple(row) for row in titles]
+
+
+def test_duplicate_isbn_in_a_batch_keeps_the_last_row(client):
+    written, errors, titles = client.portal.call(write, [
+        (2, book("First", "imp-dup-1")),
+        (3, book("Other", "imp-dup-2")),
+        (4, book("Last", "imp-dup-1")),
+    ])
+    assert (written, errors) == (2, [])
+    assert titles == [("imp-dup-1", "Last"), ("imp-dup-2", "Other")]
+
+
+def test_rejected_row_fails_alone(client):
+    broken = {**book("Broken", "imp-bad-2"), "title": None}  # passes parsing, violates NOT NULL
+    written, errors, titles = client.portal.call(write, [
+        (2, book("Kept", "imp-bad-1")),
+        (3, broken),
+        (4, book("Also kept", "imp-bad-3")),
+    ])
+    assert written == 2
+    assert [(e["event"], e["line"]) for e in errors] == [("error", 3)]
+    assert titles == [("imp-bad-1", "Kept"), ("imp-bad-3", "Also kept")]
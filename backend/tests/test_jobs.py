@@ -0,0 +1,132 @@
+"""Job queue: claim, retry with backoff, dedupe and debounce against the test database."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal
+from app.models.job import Job
+from app.services import jobs
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty registry, so a test worker only claims the job types its test registers."""
+    monkeypatch.setattr(jobs, "registry", {})
+    return jobs.registry
+
+
+async def enqueue(type: str, entity_id: int, **kwargs):
+    async with AsyncSessionLocal() as db:
+        await jobs.enqueue(db, type, entity_id, **kwargs)
+        await db.commit()
+
+
+async def rows(type: str):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Job).where(Job.type == type).order_by(Job.id))).scalars().all()
+
+
+async def claim_and_run(worker: jobs.Worker) -> int:
+    claimed = await worker._claim()
+    await asyncio.gather(*worker._tasks)
+    return claimed
+
+
+async def claim_lease():
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    @jobs.handler("test_claim", concurrency=1)
+    async def run(entity_id, payload):
+        started.set()
+        await release.wait()
+
+    await enqueue("test_claim", 1)
+    await enqueue("test_claim", 2)
+    worker = jobs.Worker()
+    claimed = await worker._claim()
+    await started.wait()
+    running = await rows("test_claim")
+    again = await worker._claim()  # the only slot is taken
+    release.set()
+    await asyncio.gather(*worker._tasks)
+    return claimed, running, again, await rows("test_claim"), worker
+
+
+def test_claim_leases_up_to_concurrency(client, registry):
+    claimed, running, again, finished, worker = client.portal.call(claim_lease)
+    assert claimed == 1 and again == 0
+    first, second = running
+    assert first.status == "running" and first.locked_by == worker.id and first.attempts == 1
+    assert first.dedupe_key is None  # a new trigger for the entity queues a fresh job
+    assert second.status == "pending" and second.attempts == 0
+    assert finished[0].status == "done" and finished[0].locked_by is None
+    assert worker.succeeded["test_claim"] == 1
+
+
+async def retry_then_fail():
+    @jobs.handler("test_retry", max_attempts=2)
+    async def run(entity_id, payload):
+        raise RuntimeError("boom")
+
+    await enqueue("test_retry", 1)
+    worker = jobs.Worker()
+    before = datetime.utcnow()
+    await claim_and_run(worker)
+    (retrying,) = await rows("test_retry")
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, retrying.id)
+        job.run_after = datetime.utcnow()
+        await db.commit()
+    await claim_and_run(worker)
+    (failed,) = await rows("test_retry")
+    return before, retrying, failed, worker
+
+
+def test_failed_job_is_retried_with_backoff_then_failed(client, registry, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "JOB_RETRY_BASE_SECONDS", 60)
+    before, retrying, failed, worker = client.portal.call(retry_then_fail)
+    assert retrying.status == "pending" and retrying.attempts == 1 and retrying.locked_by is None
+    assert retrying.last_error == "RuntimeError: boom"
+    # First retry waits between half and all of JOB_RETRY_BASE_SECONDS
+    assert before + timedelta(seconds=29) < retrying.run_after < datetime.utcnow() + timedelta(seconds=61)
+    assert failed.status == "failed" and failed.attempts == 2 and failed.finished_at is not None
+    assert (worker.retried["test_retry"], worker.failed["test_retry"]) == (1, 1)
+
+
+async def dedupe():
+    before = jobs.worker.enqueued["test_dedupe"]
+    await enqueue("test_dedupe", 1)
+    await enqueue("test_dedupe", 1)
+    async with AsyncSessionLocal() as db:
+        await jobs.enqueue_many(db, "test_dedupe", [1, 2, 3])
+        await db.commit()
+    return jobs.worker.enqueued["test_dedupe"] - before, await rows("test_dedupe")
+
+
+def test_pending_job_is_not_queued_twice(client):
+    enqueued, queued = client.portal.call(dedupe)
+    assert sorted(job.entity_id for job in queued) == [1, 2, 3]
+    assert enqueued == 3  # only inserted rows count
+
+
+async def debounce():
+    before = jobs.worker.enqueued["test_debounce"]
+    await enqueue("test_debounce", 1, delay=10, max_delay=15)
+    (first,) = await rows("test_debounce")
+    await asyncio.sleep(0.05)
+    await enqueue("test_debounce", 1, delay=10, max_delay=15)
+    (pushed,) = await rows("test_debounce")
+    await enqueue("test_debounce", 1, delay=60, max_delay=15)
+    (capped,) = await rows("test_debounce")
+    return jobs.worker.enqueued["test_debounce"] - before, first, pushed, capped
+
+
+def test_debounce_pushes_run_after_back_until_not_after(client):
+    enqueued, first, pushed, capped = client.portal.call(debounce)
+    assert enqueued == 1
+    assert first.run_after < pushed.run_after < first.not_after
+    assert pushed.not_after == first.not_after
+    assert capped.run_after == first.not_after
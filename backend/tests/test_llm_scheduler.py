@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.services import llm_scheduler
+from app.services.llm_cache import DiskStore, ResponseCache
+from app.services.llm_scheduler import LLMQueueTimeout, ProviderLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_timeout_after_admission_releases_slot(monkeypatch):
+    limiter = ProviderLimiter("test", concurrency=1, rate=0, burst=1, reserved=0)
+    await limiter.acquire("interactive", 1)  # holds the only slot
+
+    async def admitted_then_timed_out(future, timeout):
+        # The holder finishes and _dispatch admits the waiter in the tick the timeout fires
+        limiter.release("interactive")
+        assert future.done() and not future.cancelled()
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(llm_scheduler.asyncio, "wait_for", admitted_then_timed_out)
+    with pytest.raises(LLMQueueTimeout):
+        await limiter.acquire("interactive", 1)
+
+    assert limiter.in_flight == {"interactive": 0, "background": 0}
+    assert limiter.timeouts["interactive"] == 1
+
+
+async def test_queue_timeout_without_admission():
+    limiter = ProviderLimiter("test", concurrency=1, rate=0, burst=1, reserved=0)
+    await limiter.acquire("interactive", 1)
+    with pytest.raises(LLMQueueTimeout):
+        await limiter.acquire("interactive", 0.01)
+    limiter.release("interactive")
+    assert limiter.in_flight == {"interactive": 0, "background": 0}
+
+
+def test_reserved_slots_must_leave_background_one():
+    with pytest.raises(ValueError):
+        ProviderLimiter("test", concurrency=2, rate=0, burst=1, reserved=2)
+
+
+def coalescing_setup(tmp_path, concurrency: int):
+    scheduler = llm_scheduler.Scheduler()
+    limiter = scheduler._limiters["test"] = ProviderLimiter(
+        "test", concurrency=concurrency, rate=0, burst=1, reserved=1
+    )
+    cache = ResponseCache(memory_size=10, disk=DiskStore(tmp_path / "cache.sqlite3", ttl=60, max_entries=10))
+
+    async def call():
+        async with scheduler.slot("test"):
+            return "done"
+
+    async def queued_background_call():
+        async def background_call():
+            with llm_scheduler.background():
+                return await cache.get_or_call("key", call)
+
+        leader = asyncio.create_task(background_call())
+        while not limiter.stats()["background"]["queued"]:
+            await asyncio.sleep(0.005)
+        return leader
+
+    return limiter, cache, call, queued_background_call
+
+
+async def test_interactive_caller_promotes_queued_background_call(tmp_path):
+    limiter, cache, call, queued_background_call = coalescing_setup(tmp_path, concurrency=2)
+    await limiter.acquire("background", 1)  # background is at its limit; one interactive slot left
+    leader = await asyncio.wait_for(queued_background_call(), 1)
+
+    assert await asyncio.wait_for(cache.get_or_call("key", call), 1) == "done"
+    assert await leader == "done"
+    assert limiter.admitted["interactive"] == 1
+    assert limiter.in_flight == {"interactive": 0, "background": 1}
+    cache.disk.close()
+
+
+async def test_promoted_call_times_out_like_an_interactive_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_scheduler.settings, "LLM_INTERACTIVE_QUEUE_TIMEOUT_SECONDS", 0.05)
+    limiter, cache, call, queued_background_call = coalescing_setup(tmp_path, concurrency=2)
+    await limiter.acquire("interactive", 1)
+    await limiter.acquire("background", 1)  # no slot left for anyone
+    leader = await asyncio.wait_for(queued_background_call(), 1)
+
+    with pytest.raises(LLMQueueTimeout):
+        await asyncio.wait_for(cache.get_or_call("key", call), 1)
+    with pytest.raises(LLMQueueTimeout):
+        await leader
+    assert limiter.timeouts == {"interactive": 1, "background": 0}
+    assert limiter.in_flight == {"interactive": 1, "background": 1}
+    cache.disk.close()
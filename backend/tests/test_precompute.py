@@ -0,0 +1,67 @@
+"""Precomputed rows never outlive a change to the user's history."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app.db import AsyncSessionLocal
+from app.models.book import Book
+from app.models.recommendation import PrecomputedRecommendation
+from app.models.review import Borrow
+from app.models.user import User
+from app.services import precompute, recommendations
+
+FLAGS = {"genre": True, "author": False, "similar": False, "history_genre": False, "co_borrowed": False}
+
+
+async def seed(tag: str, n_books: int):
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{tag}@example.com", username=tag, hashed_password="x")
+        books = [Book(title=f"{tag} {i}", author="A", genre="sf") for i in range(n_books)]
+        db.add_all([user, *books])
+        await db.commit()
+        return user.id, [b.id for b in books]
+
+
+async def write_after_discard():
+    user_id, book_ids = await seed("precompute-late", 2)
+    read_at = datetime.utcnow() - timedelta(seconds=5)
+    async with AsyncSessionLocal() as db:
+        await recommendations.discard_precomputed(db, user_id)  # a borrow while the run was scoring
+        await db.commit()
+        written = await precompute._write_chunk(db, [(user_id, [(b, 1.0, FLAGS) for b in book_ids])], read_at)
+        rows = (await db.execute(
+            select(PrecomputedRecommendation).where(PrecomputedRecommendation.user_id == user_id)
+        )).all()
+    return written, rows
+
+
+def test_rows_scored_before_a_discard_are_not_written(client):
+    written, rows = client.portal.call(write_after_discard)
+    assert written == 0 and rows == []
+
+
+async def serve_precomputed():
+    user_id, book_ids = await seed("precompute-serve", 3)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(PrecomputedRecommendation), [
+            {"user_id": user_id, "book_id": b, "rank": r, "score": 1.0, "reason": "x", "computed_at": datetime.utcnow()}
+            for r, b in enumerate(book_ids)
+        ])
+        db.add(Borrow(user_id=user_id, book_id=book_ids[0]))
+        await db.commit()
+        served = await recommendations._precomputed_recommendations(user_id, db, 2)
+        await recommendations.discard_precomputed(db, user_id)
+        await db.execute(insert(PrecomputedRecommendation), [
+            {"user_id": user_id, "book_id": b, "rank": r, "score": 1.0, "reason": "x",
+             "computed_at": datetime.utcnow() - timedelta(seconds=5)}
+            for r, b in enumerate(book_ids[1:])
+        ])
+        await db.commit()
+        after_discard = await recommendations._precomputed_recommendations(user_id, db, 2)
+    return book_ids, served, after_discard
+
+
+def test_served_rows_skip_borrowed_books_and_discarded_runs(client):
+    book_ids, served, after_discard = client.portal.call(serve_precomputed)
+    assert [book.id for book, _, _ in served] == book_ids[1:]
+    assert after_discard is None
@@ -0,0 +1,78 @@
+"""Listing endpoints must cost a fixed number of statements however many rows they return."""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.db import AsyncSessionLocal, engine
+from app.models.book import Book
+from app.models.review import Borrow, Review
+from app.models.user import User
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def register(client, name: str) -> dict:
+    password = "pw-" + name
+    r = client.post("/auth/register", json={"email": f"{name}@example.com", "username": name, "password": password})
+    assert r.status_code == 201, r.text
+    r = client.post("/auth/login", data={"username": name, "password": password})
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+async def seed_borrows(user_id: int, n: int):
+    async with AsyncSessionLocal() as db:
+        books = [Book(title=f"Borrowed {user_id}-{i}", author="A") for i in range(n)]
+        db.add_all(books)
+        await db.flush()
+        db.add_all(Borrow(user_id=user_id, book_id=b.id) for b in books)
+        await db.commit()
+
+
+async def seed_reviews(n: int, tag: str) -> int:
+    async with AsyncSessionLocal() as db:
+        book = Book(title=f"Reviewed {tag}", author="A")
+        users = [User(email=f"{tag}{i}@example.com", username=f"{tag}{i}", hashed_password="x") for i in range(n)]
+        db.add_all([book, *users])
+        await db.flush()
+        db.add_all(Review(user_id=u.id, book_id=book.id, rating=4, text="fine") for u in users)
+        await db.commit()
+        return book.id
+
+
+@pytest.mark.parametrize("n", [1, 40])
+def test_my_borrows_is_one_query(client, n):
+    headers = register(client, f"borrower{n}")
+    user_id = client.get("/auth/me", headers=headers).json()["id"]  # also caches the principal
+    client.portal.call(seed_borrows, user_id, n)
+
+    with count_statements() as statements:
+        r = client.get("/borrows/me", headers=headers)
+
+    assert r.status_code == 200
+    assert len(r.json()) == n and all(b["book_title"] for b in r.json())
+    assert len(statements) == 1, statements
+
+
+@pytest.mark.parametrize("n", [1, 40])
+def test_book_reviews_is_one_query(client, n):
+    book_id = client.portal.call(seed_reviews, n, f"reviewer{n}x")
+
+    with count_statements() as statements:
+        r = client.get(f"/reviews/book/{book_id}")
+
+    assert r.status_code == 200
+    assert len(r.json()) == n and all(x["username"] for x in r.json())
+    assert len(statements) == 1, statements
@@ -0,0 +1,35 @@
+"""Aggregates zeroed by an in-place upgrade are rebuilt by backfill()."""
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal
+from app.models.book import Book
+from app.models.review import Review
+from app.models.user import User
+from app.services import ratings
+
+
+async def seed_upgraded_book() -> int:
+    # What an existing book looks like right after the ADD COLUMN ... DEFAULT 0 upgrade
+    async with AsyncSessionLocal() as db:
+        book = Book(title="Upgraded", author="A", avg_rating=4.5)
+        users = [User(email=f"upgrade{i}@example.com", username=f"upgrade{i}", hashed_password="x") for i in range(2)]
+        db.add_all([book, *users])
+        await db.flush()
+        db.add_all(Review(user_id=u.id, book_id=book.id, rating=r) for u, r in zip(users, (4, 5)))
+        await db.commit()
+        return book.id
+
+
+async def backfill_and_load(book_id: int):
+    async with AsyncSessionLocal() as db:
+        first = await ratings.backfill(db)
+        second = await ratings.backfill(db)
+        book = await db.scalar(select(Book).where(Book.id == book_id))
+        return first, second, book
+
+
+def test_backfill_repairs_zeroed_aggregates_once(client):
+    book_id = client.portal.call(seed_upgraded_book)
+    first, second, book = client.portal.call(backfill_and_load, book_id)
+    assert first is not None and second is None
+    assert (book.rating_sum, book.rating_count, book.rating_4, book.rating_5, book.avg_rating) == (9, 2, 1, 1, 4.5)
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import llm, recommendations
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_slow_rerank_is_shared_by_repeat_requests(monkeypatch):
+    books = [(SimpleNamespace(id=i, title=f"T{i}", author="A", genre="sf"), 1.0, "r") for i in range(3)]
+    calls = []
+    release = asyncio.Event()
+
+    async def hybrid(user_id, db, limit):
+        return books
+
+    async def history(db, user_id):
+        return ["Dune"]
+
+    async def slow_complete(prompt):
+        calls.append(prompt)
+        await release.wait()
+        return "2,0,1"
+
+    monkeypatch.setattr(recommendations, "_hybrid_recommendations", hybrid)
+    monkeypatch.setattr(recommendations, "_history_titles", history)
+    monkeypatch.setattr(llm, "llm_complete", slow_complete)
+    monkeypatch.setattr(settings, "RERANK_TIMEOUT_SECONDS", 0.01)
+
+    for _ in range(3):
+        results, reranked = await recommendations._rerank_recommendations(1, None, 3)
+        assert not reranked
+    assert len(calls) == 1
+
+    release.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    results, reranked = await recommendations._rerank_recommendations(1, None, 3)
+    assert reranked and [book.id for book, _, _ in results] == [2, 0, 1]
+    assert len(calls) == 1
+    assert not recommendations._rerank_tasks
+
+
+async def test_result_computed_across_an_invalidation_is_not_cached(monkeypatch):
+    book = SimpleNamespace(id=1, title="T", author="A", genre="sf")
+
+    async def precomputed(user_id, db, limit):
+        return None
+
+    async def hybrid(user_id, db, limit):
+        recommendations.invalidate_user(user_id)  # a borrow lands while we score
+        return [(book, 1.0, "r")]
+
+    monkeypatch.setattr(settings, "RECOMMENDATION_ENGINE", "hybrid")
+    monkeypatch.setattr(recommendations, "_precomputed_recommendations", precomputed)
+    monkeypatch.setattr(recommendations, "_hybrid_recommendations", hybrid)
+
+    assert await recommendations.get_recommendations(42, None, 1) == [(book, 1.0, "r")]
+    assert recommendations._result_cache.get((42, "hybrid")) is None
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.services import llm, sentiment
+from app.services.sentiment import SentimentBatcher
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_batch_failure_fails_callers_without_single_review_calls(monkeypatch):
+    single_calls = []
+
+    async def failing_batch(texts):
+        raise RuntimeError("provider down")
+
+    async def single(text):
+        single_calls.append(text)
+        return "positive"
+
+    monkeypatch.setattr(llm, "analyze_review_sentiments", failing_batch)
+    monkeypatch.setattr(llm, "analyze_review_sentiment", single)
+    batcher = SentimentBatcher(max_batch=3, window=1)
+
+    results = await asyncio.gather(*(batcher.classify(t) for t in ("a", "b", "c")), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert single_calls == []
+    assert batcher.llm_calls == 1
+
+
+async def test_unparsed_items_fall_back_to_single_review(monkeypatch):
+    single_calls = []
+
+    async def partial_batch(texts):
+        return ["negative", None, "neutral"]
+
+    async def single(text):
+        single_calls.append(text)
+        return "positive"
+
+    monkeypatch.setattr(llm, "analyze_review_sentiments", partial_batch)
+    monkeypatch.setattr(llm, "analyze_review_sentiment", single)
+    batcher = SentimentBatcher(max_batch=3, window=1)
+
+    results = await asyncio.gather(*(batcher.classify(t) for t in ("a", "b", "c")))
+
+    assert results == ["negative", "positive", "neutral"]
+    assert single_calls == ["b"]
+    assert batcher.fallbacks == 1
+
+
+async def test_classify_reports_who_labelled(monkeypatch):
+    async def single(text):
+        return "negative"
+
+    monkeypatch.setattr(llm, "analyze_review_sentiment", single)
+    assert await sentiment.classify("Absolutely wonderful, a masterpiece I loved") == ("positive", "local")
+    assert await sentiment.classify("The cover is blue") == ("negative", "llm")
@@ -1,7 +1,7 @@
 "use client";
 import { useEffect, useState } from "react";
 import { useParams } from "next/navigation";
-import { booksApi, reviewsApi, borrowsApi } from "@/lib/api";
+import { booksApi, reviewsApi, borrowsApi, nextCursor } from "@/lib/api";
 import { useAuthStore } from "@/lib/auth";
 import { Star, BookOpen, Download, MessageSquare } from "lucide-react";
 
@@ -22,14 +22,50 @@ export default function BookDetailPage() {
   const { id } = useParams();
   const [book, setBook] = useState<Book | null>(null);
   const [reviews, setReviews] = useState<Review[]>([]);
+  const [reviewsCursor, setReviewsCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
   const [newReview, setNewReview] = useState({ rating: 5, text: "" });
   const { user } = useAuthStore();
 
   useEffect(() => {
     booksApi.get(Number(id)).then((r) => setBook(r.data));
-    reviewsApi.forBook(Number(id)).then((r) => setReviews(r.data));
+    reviewsApi.forBook(Number(id)).then((r) => {
+      setReviews(r.data);
+      setReviewsCursor(nextCursor(r));
+    });
   }, [id]);
 
+  const loadMoreReviews = async () => {
+    setLoadingMore(true);
+    try {
+      const r = await reviewsApi.forBook(Number(id), { cursor: reviewsCursor });
+      setReviews((rs) => [...rs, ...r.data]);
+      setReviewsCursor(nextCursor(r));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Stream the AI summary token by token when it hasn't been generated yet
+  const needsSummary = book !== null && !book.ai_summary;
+  useEffect(() => {
+    if (!needsSummary) return;
+    const source = new EventSource(`${API_URL}/books/${id}/summary/stream`);
+    let text = "";
+    source.addEventListener("token", (e) => {
+      text += JSON.parse((e as MessageEvent).data).token;
+      setBook((b) => (b ? { ...b, ai_summary: text } : b));
+    });
+    source.addEventListener("done", (e) => {
+      const summary = JSON.parse((e as MessageEvent).data).summary;
+      setBook((b) => (b ? { ...b, ai_summary: summary } : b));
+      source.close();
+    });
+    source.addEventListener("error", () => source.close());
+    return () => source.close();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [id, book?.id]);
+
   const handleBorrow = async () => {
     if (!user) { window.location.href = "/auth/login"; return; }
     try {
@@ -120,7 +156,7 @@ export default function BookDetailPage() {
         {/* Reviews */}
         <div className="px-8 pb-8">
           <h3 className="font-bold text-gray-900 text-xl mb-4 flex items-center gap-2">
-            <MessageSquare className="w-5 h-5" /> Reviews ({reviews.length})
+            <MessageSquare className="w-5 h-5" /> Reviews ({reviews.length}{reviewsCursor ? "+" : ""})
           </h3>
 
           {/* Add review */}
@@ -177,6 +213,17 @@ export default function BookDetailPage() {
               </div>
             ))}
           </div>
+          {reviewsCursor && (
+            <div className="flex justify-center mt-4">
+              <button
+                onClick={loadMoreReviews}
+                disabled={loadingMore}
+                className="text-sm text-primary-600 border border-primary-200 px-4 py-1.5 rounded-lg hover:bg-primary-50 disabled:opacity-40 transition"
+              >
+                {loadingMore ? "Loading..." : "Load more reviews"}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -1,6 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
-import { borrowsApi } from "@/lib/api";
+import { borrowsApi, nextCursor } from "@/lib/api";
 import { BookMarked, CheckCircle, Clock } from "lucide-react";
 
 interface Borrow {
@@ -11,22 +11,37 @@ interface Borrow {
 export default function BorrowPage() {
   const [borrows, setBorrows] = useState<Borrow[]>([]);
   const [loading, setLoading] = useState(true);
+  const [cursor, setCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const fetchBorrows = async () => {
     try {
       const res = await borrowsApi.mine();
       setBorrows(res.data);
+      setCursor(nextCursor(res));
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await borrowsApi.mine({ cursor });
+      setBorrows((bs) => [...bs, ...res.data]);
+      setCursor(nextCursor(res));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => { fetchBorrows(); }, []);
 
   const handleReturn = async (borrowId: number) => {
     try {
-      await borrowsApi.return(borrowId);
-      await fetchBorrows();
+      // Update the row in place so pages loaded with "Load more" stay loaded
+      const res = await borrowsApi.return(borrowId);
+      setBorrows((bs) => bs.map((b) => (b.id === borrowId ? res.data : b)));
     } catch (e: any) { alert(e.response?.data?.detail || "Error returning book"); }
   };
 
@@ -97,6 +112,18 @@ export default function BorrowPage() {
             </div>
           )}
 
+          {cursor && (
+            <div className="flex justify-center mt-6">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="text-sm text-primary-600 border border-primary-200 px-4 py-1.5 rounded-lg hover:bg-primary-50 disabled:opacity-40 transition"
+              >
+                {loadingMore ? "Loading..." : "Load more"}
+              </button>
+            </div>
+          )}
+
           {borrows.length === 0 && (
             <div className="text-center py-20 text-gray-400">
               <BookMarked className="w-16 h-16 mx-auto mb-4 opacity-30" />
@@ -25,6 +25,11 @@ api.interceptors.response.use(
 
 export default api;
 
+// List endpoints return the next page's cursor in the X-Next-Cursor header
+export type PageParams = { cursor?: string; limit?: number };
+export const nextCursor = (res: { headers: Record<string, any> }): string | undefined =>
+  res.headers["x-next-cursor"];
+
 // ---- Auth ----
 export const authApi = {
   register: (data: { email: string; username: string; password: string }) =>
@@ -42,7 +47,7 @@ export const authApi = {
 
 // ---- Books ----
 export const booksApi = {
-  list: (params?: { search?: string; genre?: string; skip?: number; limit?: number }) =>
+  list: (params?: { search?: string; genre?: string; cursor?: string; skip?: number; limit?: number }) =>
     api.get("/books", { params }),
   get: (id: number) => api.get(`/books/${id}`),
   create: (formData: FormData) => api.post("/books", formData),
@@ -54,12 +59,12 @@ export const booksApi = {
 export const borrowsApi = {
   borrow: (bookId: number) => api.post(`/borrows/${bookId}`),
   return: (borrowId: number) => api.post(`/borrows/${borrowId}/return`),
-  mine: () => api.get("/borrows/me"),
+  mine: (params?: PageParams) => api.get("/borrows/me", { params }),
 };
 
 // ---- Reviews ----
 export const reviewsApi = {
-  forBook: (bookId: number) => api.get(`/reviews/book/${bookId}`),
+  forBook: (bookId: number, params?: PageParams) => api.get(`/reviews/book/${bookId}`, { params }),
   create: (bookId: number, data: { rating: number; text?: string }) =>
     api.post(`/reviews/book/${bookId}`, data),
   delete: (reviewId: number) => api.delete(`/reviews/${reviewId}`),